@@ -1,6 +1,7 @@
 import pygame
 from logic.tiles.color import Color
 from logic.tiles.shape import Shape
+from logic.tiles.tile import tile_prototypes
 
 
 pygame.font.init()  # shapes are drawn as unicode characters
@@ -19,6 +20,13 @@ bot_btn_height = 50
 bot_btn_width = 135
 bot_btn_shadow = 4
 
+# board view and origin, built again only when the board tiles change, and off-screen surface
+# of the tiles in the window and a margin around it, blitted at the scroll offset and drawn
+# again only when the tiles or the window size change or the view scrolls out of the margin
+board_cache = {'board key': None, 'board': [[0]], 'view origin': (0, 0), 'key': None, 'surface': None,
+               'surface origin': (0, 0)}
+board_surface_margin = 8 * board_pos_size
+
 def get_tile_rgb(color):
     rgb_values = {
         Color.BLUE.value:   (0, 102, 255),
@@ -43,19 +51,74 @@ def get_shape_x_offset(shape):
     return offsets.get(shape, 2)
 
 
-def draw_tile(window, tile, x, y):
-    pygame.draw.rect(window, tile_background_color, (x + tile_padding, y + tile_padding, tile_size, tile_size))
-
+def render_tile_surface(tile):
     shape_color = get_tile_rgb(tile.color)
     shape_text = shape_font.render(tile.shape, True, shape_color)
     shape_y_offset = 2
     shape_x_offset = get_shape_x_offset(tile.shape)
-    window.blit(shape_text, (x + shape_x_offset, y + shape_y_offset))
+
+    # transparent around the tile, the shape can overflow its board position
+    width = max(tile_padding + tile_size, shape_x_offset + shape_text.get_width())
+    height = max(tile_padding + tile_size, shape_y_offset + shape_text.get_height())
+    surface = pygame.Surface((width, height), pygame.SRCALPHA)
+    pygame.draw.rect(surface, tile_background_color, (tile_padding, tile_padding, tile_size, tile_size))
+    surface.blit(shape_text, (shape_x_offset, shape_y_offset))
+    return surface
+
+
+# pre-rendered tiles by tile id, the shapes aren't rendered again in each frame
+tile_surfaces = [render_tile_surface(tile) for tile in tile_prototypes]
+
+
+def draw_tile(window, tile, x, y):
+    window.blit(tile_surfaces[tile.id], (x, y))
+
+
+# window area covered by a board position, the highlight and the shape overflow it
+board_pos_area = max([44] + [max(surface.get_size()) for surface in tile_surfaces])
+
+
+def get_board_view(board_object):
+    board_key = (board_object.zobrist_hash, len(board_object.tiles))
+    if board_cache['board key'] != board_key:
+        board_cache['board key'] = board_key
+        board_cache['board'] = board_object.board
+        board_cache['view origin'] = board_object.get_view_origin()
+    return board_cache['board'], board_cache['view origin']
+
+
+def get_visible_range(rows, cols, scroll_x, scroll_y, window_size):
+    width, height = window_size
+    # a position more above and to the left, its shape can overflow into the window
+    first_row = max(0, -scroll_y // board_pos_size - 1)
+    last_row = min(rows, (height - scroll_y) // board_pos_size + 1)
+    first_col = max(0, -scroll_x // board_pos_size - 1)
+    last_col = min(cols, (width - scroll_x) // board_pos_size + 1)
+    return first_row, last_row, first_col, last_col
+
+
+def draw_board(window, board_object, scroll_x, scroll_y):
+    board, view_origin = get_board_view(board_object)
+    width, height = window.get_size()
+    key = (board_cache['board key'], (width, height))
+    surface_x, surface_y = board_cache['surface origin']  # board view pixel of the surface corner
+    if board_cache['key'] != key or not (surface_x <= -scroll_x and surface_y <= -scroll_y and
+                                         -scroll_x + width <= surface_x + width + 2 * board_surface_margin and
+                                         -scroll_y + height <= surface_y + height + 2 * board_surface_margin):
+        surface_x, surface_y = -scroll_x - board_surface_margin, -scroll_y - board_surface_margin
+        surface = pygame.Surface((width + 2 * board_surface_margin, height + 2 * board_surface_margin), pygame.SRCALPHA)
+        draw_grid(surface, board, -surface_x, -surface_y)
+        board_cache['key'] = key
+        board_cache['surface'] = surface
+        board_cache['surface origin'] = (surface_x, surface_y)
+    window.blit(board_cache['surface'], (surface_x + scroll_x, surface_y + scroll_y))
 
 
 def draw_grid(window, board, scroll_x, scroll_y):
-    for row in range(len(board)):
-        for col in range(len(board[row])):
+    first_row, last_row, first_col, last_col = get_visible_range(len(board), len(board[0]), scroll_x, scroll_y,
+                                                                 window.get_size())
+    for row in range(first_row, last_row):
+        for col in range(first_col, last_col):
             tile = board[row][col]
             tile_x = (col * board_pos_size) + scroll_x
             tile_y = (row * board_pos_size) + scroll_y
@@ -178,3 +241,41 @@ def draw_combo_points_and_bag(window, combo_points, tiles_left):
     window.blit(points_text, (150, window_height - 200))
     points_text = text_font.render(str(combo_points) + " pts", True, (255, 51, 153))
     window.blit(points_text, (240, window_height - 200))
+
+
+def draw_thinking(window, bot_index):
+    window_height = pygame.display.get_surface().get_size()[1]
+    thinking_text = text_font.render("Thinking...", True, (60, 60, 60))
+    window.blit(thinking_text, (620, window_height - (145 if bot_index == 0 else 65)))
+
+
+def get_dirty_rects(last_frame, frame):
+    width, height = frame['window size']
+    # a new game, a resize, a scroll or tiles played before the view origin move everything
+    if last_frame is None or any(last_frame[key] != frame[key] for key in ('game', 'window size', 'scroll', 'view origin')):
+        return [pygame.Rect(0, 0, width, height)]
+
+    dirty_rects = []
+    if last_frame['board'] != frame['board'] or last_frame['highlights'] != frame['highlights']:
+        if last_frame['highlights'] == frame['highlights']:
+            return [pygame.Rect(0, 0, width, height)]
+        # played tiles are the highlighted ones
+        scroll_x, scroll_y = frame['scroll']
+        for row, col in last_frame['highlights'] + frame['highlights']:
+            dirty_rects.append(pygame.Rect(col * board_pos_size + scroll_x, row * board_pos_size + scroll_y,
+                                           board_pos_area, board_pos_area))
+
+    if last_frame['hovered button'] != frame['hovered button']:
+        update_buttons_positions()
+        button_rects = {"points bot plays": bot_plays_rects[0], "smarter bot plays": bot_plays_rects[1],
+                        "set game state": option_rects[0], "reset": option_rects[1]}
+        for button in (last_frame['hovered button'], frame['hovered button']):
+            if button is not None:
+                dirty_rects.append(pygame.Rect(button_rects[button]))
+    if last_frame['hands'] != frame['hands']:
+        dirty_rects.append(pygame.Rect(150, height - 160, 320, 130))  # racks and points
+    if last_frame['status'] != frame['status']:
+        dirty_rects.append(pygame.Rect(10, height - 200, 390, 30))  # bag and last combo points
+    if last_frame['thinking'] != frame['thinking']:
+        dirty_rects.append(pygame.Rect(620, height - 150, 120, 110))
+    return dirty_rects
@@ -2,9 +2,35 @@ from gui.display_utilities import *
 from gui.tile_translation_utilities import *
 from logic.bots.bot import Bot
 from logic.bots.smarter_bot import SmarterBot
+from logic.bots.transposition_cache import TranspositionCache
+from logic.game import Game
 from logic.game_objects.bag import Bag
 from logic.game_objects.board import Board
 import ast
+import queue
+import threading
+import traceback
+
+def search_turn(game, bot, board, turn_results):
+    """ Searches the combo of a bot turn in a worker thread, so the window keeps drawing
+        and scrolling. The search plays and undoes tiles, so it runs on a copy of the board.
+        The combo is handed back to the render loop through a queue, and so is the error if the
+        search fails, so the render loop always learns that the search ended.
+
+        Args:
+            game(:obj:`Game`): Game of the turn.
+            bot(:obj:`Bot`): Bot that plays the turn.
+            board(:obj:`Board`): Copy of the game board.
+            turn_results(:obj:`queue.Queue`): Queue of (game, bot, combo, error) results,
+                the error is None if the search succeeded.
+
+    """
+    try:
+        turn_results.put((game, bot, bot.get_best_combo(board), None))
+    except Exception as error:
+        traceback.print_exc()
+        turn_results.put((game, bot, None, error))
+
 
 def run_gui():
     fps = 60 # pygame frame rate
@@ -12,23 +38,23 @@ def run_gui():
     pygame.display.set_caption('Qwirkle') # window title
     clock = pygame.time.Clock() # clock used to refresh the display
 
-    board_object = Board() # board object that contains the tile grid
-    highlighted_positions = [] # last positions played by a bot are highlighted
-
-    bag = Bag() # contains the game tiles initially
+    highlighted_positions = [] # last positions played by a bot are highlighted, in board view coordinates
 
-    points_bot = Bot() # first bot, decides only based on points
-    smarter_bot = SmarterBot() # second bot, decides upon qwirkle chances and lines killed
+    cache = TranspositionCache() # positions searched by the bots are not searched again
+    # points bot decides only based on points, smarter bot upon qwirkle chances and lines killed
+    game = Game([Bot(cache=cache), SmarterBot(cache=cache)]) # game with its board and bag, both bots draw tiles
     last_combo_points = 0 # the last combo points are displayed
 
-    points_bot.draw_tiles(bag) # both bots draw tiles
-    smarter_bot.draw_tiles(bag)
+    turn_results = queue.Queue() # bot turns searched in a worker thread, played by the render loop
+    search_thread = None
+    thinking_bot = None # bot searching its turn, a thinking indicator is displayed
 
     scroll_x = 0 # scroll values are used to move the board on screen
     scroll_y = 0
     scrolling_velocity = 2
 
-    game_finished = False # indicates if the game is finished
+    last_frame = None # values displayed in the last frame, only the window areas that change are updated
+
     run = True
     while run:
 
@@ -38,40 +64,35 @@ def run_gui():
 
             if event.type == pygame.VIDEORESIZE:  # screen resize update event
                 window = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
+                last_frame = None
+
+            if event.type == pygame.VIDEOEXPOSE:  # window has to be drawn again
+                last_frame = None
 
             if event.type == pygame.MOUSEBUTTONDOWN:  # button events
                 button_action = get_button_action(pygame.mouse.get_pos())
                 if button_action:
 
-                    if button_action == "points bot plays" or button_action == "smarter bot plays" and not game_finished: # bot plays turn
-                        bot = points_bot if button_action == "points bot plays" else smarter_bot
-                        combo = bot.get_best_combo(board_object)
-                        if combo is not None:
-                            last_combo_points = bot.get_combo_points(board_object, combo)
-                            bot.points += last_combo_points
-                            bot.play_combo(board_object, combo)
-                            bot.remove_tiles_from_hand(combo.tiles)
-                            bot.draw_tiles(bag)
-
-                            highlighted_positions = board_object.get_current_tiles_positions(combo.tiles)
-                        else:
-                            bag.swap_all_tiles(bot) # bot can't play any combo with current hand
-
-                        if bot.out_of_tiles():  # game is finished
-                            game_finished = True
+                    # a search is pending until its result is consumed, the thread is also checked so a
+                    # search of a reset game doesn't run along a new one on the shared cache
+                    searching = thinking_bot is not None or (search_thread is not None and search_thread.is_alive())
+                    if (button_action == "points bot plays" or button_action == "smarter bot plays") and not game.finished \
+                            and not searching: # bot searches its turn, clicks during a search are ignored
+                        points_bot, smarter_bot = game.bots
+                        thinking_bot = points_bot if button_action == "points bot plays" else smarter_bot
+                        board_copy = Board()
+                        board_copy.restore_state(game.board.get_state())
+                        search_thread = threading.Thread(target=search_turn, args=(game, thinking_bot, board_copy, turn_results),
+                                                         daemon=True)
+                        search_thread.start()
 
                     if button_action == "reset" or button_action == "set game state": # common reset code between reset  and set game state
-                        game_finished = False
-                        bag = Bag()
-                        points_bot = Bot()
-                        smarter_bot = SmarterBot()
                         last_combo_points = 0
                         highlighted_positions = []
+                        thinking_bot = None # the result of a running search is discarded
 
                     if button_action == "reset":  # reset game
-                        board_object = Board([[0]])
-                        points_bot.draw_tiles(bag)
-                        smarter_bot.draw_tiles(bag)
+                        game = Game([Bot(cache=cache), SmarterBot(cache=cache)])
 
                     if button_action == "set game state": # set board state
                         string_board = []
@@ -84,15 +105,24 @@ def run_gui():
                             string_hand = input("Bot hand: ")
 
                         board_object = Board(translate_tile_board(ast.literal_eval(string_board)))
-
-                        points_bot.hand = translate_tile_list(ast.literal_eval(string_hand))
-                        if not points_bot.hand:
-                            points_bot.draw_tiles(bag)
-
-                        smarter_bot.hand = translate_tile_list(ast.literal_eval(string_hand))
-                        if not smarter_bot.hand:
-                            smarter_bot.draw_tiles(bag)
-
+                        game = Game([Bot(cache=cache), SmarterBot(cache=cache)], Bag(), board_object, deal=False)
+
+                        for bot in game.bots:
+                            bot.hand = translate_tile_list(ast.literal_eval(string_hand))
+                            if not bot.hand:
+                                bot.draw_tiles(game.bag)
+
+        try: # bot plays the turn searched by the worker thread
+            turn_game, turn_bot, combo, error = turn_results.get_nowait()
+            if turn_game is game:
+                thinking_bot = None
+                if error is None and not game.finished: # a failed search doesn't play the turn
+                    game.play_turn(turn_bot, combo)
+                    if combo is not None:
+                        last_combo_points = game.last_points
+                        highlighted_positions = [game.board.get_view_position(pos) for pos in combo.positions]
+        except queue.Empty:
+            pass
 
         pressed = pygame.key.get_pressed() # board scrolling key events
         if pressed[pygame.K_DOWN] or pressed[pygame.K_s]:
@@ -104,15 +134,28 @@ def run_gui():
         if pressed[pygame.K_RIGHT] or pressed[pygame.K_d]:
             scroll_x -= scrolling_velocity
 
-        window.fill((245, 245, 245)) # window background
-
-        highlight_positions(window, highlighted_positions, scroll_x, scroll_y)
-        draw_grid(window, board_object.board, scroll_x, scroll_y)
-        draw_combo_points_and_bag(window, last_combo_points, len(bag))
-        draw_bots_hands(window, points_bot, smarter_bot)
-        draw_buttons(window, pygame.mouse.get_pos())
-        #pygame.mouse.get_pos()
-        pygame.display.update()  # update display
+        mouse_pos = pygame.mouse.get_pos()
+        frame = {'game': game, 'window size': window.get_size(), 'scroll': (scroll_x, scroll_y),
+                 'board': (game.board.zobrist_hash, len(game.board.tiles)), 'view origin': get_board_view(game.board)[1],
+                 'highlights': [(pos.row, pos.col) for pos in highlighted_positions],
+                 'hovered button': get_button_action(mouse_pos),
+                 'hands': [(bot.points, list(bot.hand)) for bot in game.bots],
+                 'status': (last_combo_points, len(game.bag)),
+                 'thinking': game.bots.index(thinking_bot) if thinking_bot is not None else None}
+        dirty_rects = get_dirty_rects(last_frame, frame)
+        last_frame = frame
+
+        if dirty_rects: # the window is drawn again only when something changes
+            window.fill((245, 245, 245)) # window background
+
+            highlight_positions(window, highlighted_positions, scroll_x, scroll_y)
+            draw_board(window, game.board, scroll_x, scroll_y)
+            draw_combo_points_and_bag(window, last_combo_points, len(game.bag))
+            draw_bots_hands(window, game.bots[0], game.bots[1])
+            draw_buttons(window, mouse_pos)
+            if thinking_bot is not None:
+                draw_thinking(window, frame['thinking'])
+            pygame.display.update(dirty_rects)  # update changed areas of the display
         clock.tick(fps)  # keep constant frame rate
 
     pygame.quit() # close window
@@ -0,0 +1,370 @@
+import argparse
+import ast
+import json
+import os
+import platform
+import re
+import sys
+import time
+
+from gui.tile_translation_utilities import board_presets, translate_tile_board, translate_tile_list
+from logic.bots.bot import Bot
+from logic.bots.search_stats import SearchStats
+from logic.bots.smarter_bot import SmarterBot
+from logic.game import Game
+from logic.game_objects.bag import Bag
+from logic.game_objects.board import Board
+from logic.game_objects.numpy_board import NumpyBoard, np
+from logic.tiles import tile as tile_module
+from logic.tiles.tile import Tile, tiles_to_bytes
+
+sample_data_path = os.path.join(os.path.dirname(__file__), 'sample_data.txt')
+
+# self-play snapshots of the corpus, taken at these turns of the seeded games
+snapshot_turns = (5, 20, 40)
+snapshot_seeds = (0, 1, 2, 3)
+
+# seeds of the full games timed
+game_seeds = (0, 1)
+
+
+def get_sample_tiles(expression):
+    """ Evaluates a sample data literal of nested lists of zeros and tiles. Tiles are written
+        as strings like '●yl' or as the names of the testing instances of logic.tiles.tile,
+        like b_crc. Every tile is a new instance.
+
+        Args:
+            expression(str): Literal.
+
+        Returns:
+            :obj:`list`: Nested lists of zeros and tiles.
+
+    """
+    def get_value(node):
+        if isinstance(node, ast.List):
+            return [get_value(element) for element in node.elts]
+        if isinstance(node, ast.Name):
+            tile = getattr(tile_module, node.id)
+            return Tile(tile.color, tile.shape)
+        value = ast.literal_eval(node)
+        return Tile(value[1:], value[0]) if isinstance(value, str) else value
+
+    return get_value(ast.parse(expression.strip(), mode='eval').body)
+
+
+def get_bracketed(text, start):
+    """ Returns the bracketed expression of a text that starts at an index.
+    """
+    depth = 0
+    for index in range(start, len(text)):
+        depth += {'[': 1, ']': -1}.get(text[index], 0)
+        if depth == 0:
+            return text[start:index + 1]
+    return text[start:]
+
+
+def get_sample_data_positions(path=sample_data_path):
+    """ Returns the positions of the sample data file. Each case starts with a # title line
+        and has a board, written as board = [...], board_state = [...] or Board([...]),
+        and a hand, written as hand = [...] or as the tiles = [...] of a combo.
+
+        Args:
+            path(str): Sample data file path.
+
+        Returns:
+            :obj:`list` of tuple: Name, board and hand of each position.
+
+    """
+    with open(path, encoding='utf-8') as sample_data:
+        text = sample_data.read()
+
+    positions = []
+    for case in re.split(r'^\s*# ', text, flags=re.MULTILINE)[1:]:
+        board_match = re.search(r'(?:board(?:_state)? = |Board\()\[', case)
+        hand_match = re.search(r'(?:hand|tiles) = \[', case)
+        if board_match is None or hand_match is None:
+            continue
+        board = Board(get_sample_tiles(get_bracketed(case, board_match.end() - 1)))
+        hand = get_sample_tiles(get_bracketed(case, hand_match.end() - 1))
+        positions.append(('sample %d: %s' % (len(positions), case.splitlines()[0].strip()), board, hand))
+    return positions
+
+
+def get_snapshot_positions(turns=snapshot_turns, seeds=snapshot_seeds):
+    """ Returns self-play positions, the board and hand of the next bot after some turns
+        of seeded games between the smarter bot and the points bot.
+
+        Args:
+            turns(:obj:`tuple` of int): Turns of the snapshots.
+            seeds(:obj:`tuple` of int): Seeds of the games.
+
+        Returns:
+            :obj:`list` of tuple: Name, board and hand of each position.
+
+    """
+    positions = []
+    for seed in seeds:
+        game = Game([SmarterBot(), Bot()], bag=Bag(seed=seed))
+        for turn in sorted(turns):
+            if not game.play_to_end(turn):
+                board = Board()
+                board.restore_state(game.board.get_state())
+                positions.append(('seed %d turn %d' % (seed, turn), board, list(game.get_current_bot().hand)))
+    return positions
+
+
+def get_corpus():
+    """ Returns the benchmark positions: the GUI board presets, the sample data positions and
+        the self-play snapshots. Positions with the board and hand of an earlier one are dropped.
+
+        Returns:
+            :obj:`list` of tuple: Name, board and hand of each position.
+
+    """
+    positions = []
+    for preset_index, (string_hand, string_board) in enumerate(board_presets):
+        board = Board(translate_tile_board(ast.literal_eval(string_board)))
+        positions.append(('preset %d' % preset_index, board, translate_tile_list(ast.literal_eval(string_hand))))
+
+    corpus = []
+    position_keys = set()
+    for name, board, hand in positions + get_sample_data_positions() + get_snapshot_positions():
+        position_key = (board.to_bytes(), tiles_to_bytes(hand))
+        if position_key not in position_keys:
+            position_keys.add(position_key)
+            corpus.append((name, board, hand))
+    return corpus
+
+
+def get_bot(bot_class, hand, search_method='lines'):
+    """ Returns a new bot of a class with a copy of a hand.
+    """
+    bot = bot_class(search_method)
+    bot.hand = list(hand)
+    return bot
+
+
+def time_find_combos(corpus, search_method):
+    """ Finds the combos of every position, returns the number found by position.
+    """
+    work = {}
+    for name, board, hand in corpus:
+        combos = []
+        get_bot(Bot, hand, search_method).find_combos(board, combos)
+        work[name] = len(combos)
+    return work
+
+
+def time_get_combo_points(corpus):
+    """ Scores every combo of every position one by one, returns the sum of their points by position.
+    """
+    work = {}
+    for name, board, hand in corpus:
+        bot = get_bot(Bot, hand)
+        combos = []
+        bot.find_combos(board, combos)
+        work[name] = sum(bot.get_combo_points(board, combo) for combo in combos)
+    return work
+
+
+def time_get_best_combo(corpus, bot_class):
+    """ Decides the combo of a bot class in every position, returns the search nodes expanded,
+        the combos found and the points of the decided combo by position.
+    """
+    work = {}
+    for name, board, hand in corpus:
+        bot = get_bot(bot_class, hand)
+        bot.stats = SearchStats()
+        combo = bot.get_best_combo(board)
+        work[name] = [bot.stats.nodes_expanded, bot.stats.combos_emitted,
+                      bot.get_carried_points(board, combo) if combo is not None else 0]
+    return work
+
+
+def time_full_games(seeds=game_seeds):
+    """ Plays seeded games between the smarter bot and the points bot, returns the turns played
+        and the points of both bots by seed.
+    """
+    work = {}
+    for seed in seeds:
+        game = Game([SmarterBot(), Bot()], bag=Bag(seed=seed))
+        game.play_to_end()
+        work['seed %d' % seed] = [game.turns] + [bot.points for bot in game.bots]
+    return work
+
+
+def check_evaluators(corpus):
+    """ Checks the numpy evaluator against the scalar one over a corpus. The qwirkle chances,
+        points and lines killed of every combo of both searches are evaluated by
+        NumpyBoard.evaluate and by SmarterBot.get_combo_features, which scores the combo again.
+        Then both bots have to pick the same combo with both evaluators, ties included.
+
+        Args:
+            corpus(:obj:`list` of tuple): Benchmark positions, see get_corpus.
+
+        Returns:
+            :obj:`list` of str: Description of the mismatches, empty if the evaluators agree.
+
+    """
+    mismatches = []
+    for name, board, hand in corpus:
+        for search_method in ('lines', 'permutations'):
+            bot = get_bot(SmarterBot, hand, search_method)
+            combos = list(bot.iter_combos(board))
+            if not combos:
+                continue
+            chances, points, kills = NumpyBoard(board).get_combos_features(combos)
+            for combo_index, combo in enumerate(combos):
+                scalar_combo = combo.copy()
+                scalar_combo.points = None
+                scalar_features = bot.get_combo_features(board, scalar_combo)
+                numpy_features = (chances[combo_index], points[combo_index], kills[combo_index])
+                if scalar_features != numpy_features:
+                    mismatches.append("%s %s features of %s: scalar %s, numpy %s" % (
+                        name, search_method, combo, scalar_features, tuple(int(value) for value in numpy_features)))
+
+        for bot_class in (Bot, SmarterBot):
+            scalar_combo = get_bot(bot_class, hand).get_best_combo(board)
+            numpy_bot = get_bot(bot_class, hand)
+            numpy_bot.evaluator = 'numpy'
+            numpy_combo = numpy_bot.get_best_combo(board)
+            if str(scalar_combo) != str(numpy_combo):
+                mismatches.append("%s %s picks: scalar %s, numpy %s" % (name, bot_class.__name__, scalar_combo,
+                                                                        numpy_combo))
+    return mismatches
+
+
+def get_benchmarks(corpus):
+    """ Returns the benchmarks to time over a corpus.
+
+        Args:
+            corpus(:obj:`list` of tuple): Benchmark positions, see get_corpus.
+
+        Returns:
+            :obj:`dict`: Functions without arguments by benchmark name, each one returns
+                         the work done by position, to check runs do the same work.
+
+    """
+    return {
+        'find_combos lines': lambda: time_find_combos(corpus, 'lines'),
+        'find_valid_combos': lambda: time_find_combos(corpus, 'permutations'),
+        'get_combo_points': lambda: time_get_combo_points(corpus),
+        'Bot.get_best_combo': lambda: time_get_best_combo(corpus, Bot),
+        'SmarterBot.get_best_combo': lambda: time_get_best_combo(corpus, SmarterBot),
+        'full game': time_full_games,
+    }
+
+
+def run_benchmarks(repeat=3, selected=None):
+    """ Times the benchmarks over the corpus. The time of a benchmark is the minimum of its
+        repetitions, the least disturbed by other processes.
+
+        Args:
+            repeat(int): Repetitions of each benchmark.
+            selected(:obj:`list` of str): Names of the benchmarks to run, all if None.
+
+        Returns:
+            :obj:`dict`: Benchmark results with the environment and corpus description.
+
+    """
+    corpus = get_corpus()
+    results = {}
+    for name, benchmark in get_benchmarks(corpus).items():
+        if selected and name not in selected:
+            continue
+        times = []
+        for repetition in range(repeat):
+            start_time = time.perf_counter()
+            work = benchmark()
+            times.append(time.perf_counter() - start_time)
+        results[name] = {'seconds': min(times), 'times': times, 'work': work}
+
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'corpus': [name for name, board, hand in corpus], 'benchmarks': results}
+
+
+def compare_results(results, baseline, threshold=0.1):
+    """ Compares benchmark results with a baseline, their times and the work they did by position.
+
+        Args:
+            results(:obj:`dict`): Benchmark results, see run_benchmarks.
+            baseline(:obj:`dict`): Baseline benchmark results.
+            threshold(float): Relative slowdown flagged as a regression.
+
+        Returns:
+            :obj:`list` of tuple: Name, baseline seconds, seconds, relative change, regression
+                                  flag and work differences of the benchmarks in both results.
+                                  Work differences are (position, baseline work, work) tuples,
+                                  the work is None for positions missing in one of the results.
+
+    """
+    comparison = []
+    for name, result in results['benchmarks'].items():
+        baseline_result = baseline['benchmarks'].get(name)
+        if baseline_result is None:
+            continue
+        change = result['seconds'] / baseline_result['seconds'] - 1 if baseline_result['seconds'] else 0.0
+        work, baseline_work = result['work'], baseline_result['work']
+        work_differences = [(position, baseline_work.get(position), work.get(position))
+                            for position in list(baseline_work) + [position for position in work
+                                                                   if position not in baseline_work]
+                            if baseline_work.get(position) != work.get(position)]
+        comparison.append((name, baseline_result['seconds'], result['seconds'], change, change > threshold,
+                           work_differences))
+    return comparison
+
+
+def main(args=None):
+    """ Command line entry point, checks the numpy evaluator against the scalar one, runs the
+        benchmarks and saves them as JSON, optionally comparing them with a baseline. Exits
+        with status 1 if the evaluators differ, a regression is found or the benchmarks
+        didn't do the same work as the baseline.
+        Run as python -m logic.benchmark --output results.json --compare baseline.json.
+
+        Args:
+            args(:obj:`list` of str): Command line arguments, sys.argv if None.
+
+    """
+    parser = argparse.ArgumentParser(description="Times the qwirkle bots over a fixed corpus of positions.")
+    parser.add_argument('--output', help="JSON file to save the results")
+    parser.add_argument('--compare', help="JSON results of a baseline run")
+    parser.add_argument('--threshold', type=float, default=0.1, help="relative slowdown flagged as a regression")
+    parser.add_argument('--repeat', type=int, default=3, help="repetitions of each benchmark")
+    parser.add_argument('--benchmark', action='append', help="benchmark to run, all by default")
+    parser.add_argument('--skip-checks', action='store_true', help="don't check the numpy evaluator")
+    args = parser.parse_args(args)
+
+    if not args.skip_checks and np is not None:
+        mismatches = check_evaluators(get_corpus())
+        for mismatch in mismatches:
+            print(mismatch)
+        if mismatches:
+            print("numpy evaluator differs from the scalar one in %d checks" % len(mismatches))
+            sys.exit(1)
+        print("numpy evaluator matches the scalar one")
+
+    results = run_benchmarks(args.repeat, args.benchmark)
+    for name, result in results['benchmarks'].items():
+        print("%-28s %9.4fs" % (name, result['seconds']))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        comparison = compare_results(results, baseline, args.threshold)
+        print('')
+        for name, baseline_seconds, seconds, change, regression, work_differences in comparison:
+            print("%-28s %9.4fs -> %9.4fs %+7.1f%%%s" % (name, baseline_seconds, seconds, change * 100,
+                                                         "  REGRESSION" if regression else ""))
+            for position, baseline_work, work in work_differences:
+                print("    work differs in %s: %s -> %s" % (position, baseline_work, work))
+        if any(regression or work_differences for name, baseline_seconds, seconds, change, regression,
+               work_differences in comparison):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
+import heapq
+import time
 
+from logic.bots.search_budget import SearchBudget
 from logic.combos.position import Position
 from logic.combos.restriction_tile import  TileRestriction
 from logic.combos.tile_combo import TileCombo
+from logic.game_objects.numpy_board import NumpyBoard
+from logic.tiles.line import get_line_mask, get_line_points, is_valid_line_mask, line_points
+
+# line directions as (row step, col step)
+horizontal = (0, 1)
+vertical = (1, 0)
 
 class Bot:
     """ Simple bot that plays the move that produces the most points
@@ -10,59 +19,499 @@ class Bot:
         Attributes:
             hand(:obj:`list` of :obj:`Tile`): List of playable tiles.
             points(int): Bot current points.
+            search_method(str): Combo search used, 'lines' or 'permutations'.
+            cache(:obj:`TranspositionCache`): Best combos of the positions already searched, or None.
+            evaluator(str): Combo evaluation used, 'scalar' or 'numpy'.
+            stats(:obj:`SearchStats`): Search counters and phase times, only collected when set.
     """
 
+    stats = None  # instrumentation is off unless a SearchStats is set
+
+
+    def __init__(self, search_method='lines', cache=None, evaluator='scalar'):
+        """ The constructor can receive the combo search method, a transposition cache,
+            which can be shared by several bots, and the combo evaluator.
 
-    def __init__(self):
+            Args:
+                search_method(str): 'lines' places line-compatible tile sets as runs on the board,
+                                    'permutations' backtracks over every ordering of the hand.
+                cache(:obj:`TranspositionCache`): Cache checked before searching a position.
+                evaluator(str): 'scalar' evaluates combos one at a time while they are found,
+                                'numpy' finds them all and evaluates them at once with a NumpyBoard.
+
+        """
         self.hand = []
         self.points = 0
+        self.search_method = search_method
+        self.cache = cache
+        self.evaluator = evaluator
 
 
-    def get_best_combo(self, board):
+    def get_best_combo(self, board, deadline=None, node_budget=None):
         """ Decides combo to play in a turn for a given board, based on current tile hand.
-            Uses find_valid_combos backtracking method to find all the possible plays and returns
-            the one that scores the most points.
+            The search can be limited by a deadline or a number of search nodes, see
+            search_best_combo.
 
             Args:
                 board(:obj:`Board`): Board object instance with the current game state.
+                deadline(float): time.perf_counter() value when the search has to stop.
+                node_budget(int): Number of search nodes the search can expand.
 
             Returns:
                 :obj:`TileCombo`: Steps that indicates which tiles to play in which positions.
         """
-        combos = []  # list of TileCombo objects
+        return self.search_best_combo(board, deadline, node_budget)[0]
+
+
+    def search_best_combo(self, board, deadline=None, node_budget=None):
+        """ Decides combo to play in a turn, returning the cached combo of the position if
+            there is one, otherwise the one decided by decide_combo. Combos are searched by
+            increasing length, so when the budget runs out the best combo found so far is
+            returned, the search goes on until it finds one.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                deadline(float): time.perf_counter() value when the search has to stop.
+                node_budget(int): Number of search nodes the search can expand.
+
+            Returns:
+                tuple: Best combo found, None if nothing can be played, and True if the
+                       search finished or false if the budget ran out.
+        """
+        start_time = time.perf_counter() if self.stats is not None else None
+
+        cache_key = self.cache.get_key(self, board) if self.cache is not None else None
+        cached_entry = self.cache.get(cache_key) if cache_key is not None else None
+        if cached_entry is not None:
+            best_combo, finished = self.get_hand_combo(cached_entry[0]), True
+        else:
+            budget = SearchBudget(deadline, node_budget) if deadline is not None or node_budget is not None else None
+            best_combo = self.decide_combo(board, budget)
+            finished = budget is None or not budget.stopped
+            # combos of unfinished searches can be beaten, they aren't cached
+            if cache_key is not None and finished:
+                best_points = self.get_carried_points(board, best_combo) if best_combo else None
+                self.cache.put(cache_key, best_combo, best_points)
+
+        if start_time is not None:
+            self.stats.add_time('search', time.perf_counter() - start_time)
+        return best_combo, finished
+
+
+    def decide_combo(self, board, budget=None):
+        """ Searches the combo that scores the most points, the top 1 of get_top_k.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                budget(:obj:`SearchBudget`): Limits of the search, or None.
+
+            Returns:
+                :obj:`TileCombo`: Best combo, None if nothing can be played.
+
+        """
+        if self.evaluator == 'numpy':
+            return self.get_best_batch_combo(board, budget)
+
+        top_combos = self.get_top_k(board, 1, budget)
+        # None in the rare condition where nothing can be played with the current hand
+        return top_combos[0] if top_combos else None
+
+
+    def get_best_batch_combo(self, board, budget=None):
+        """ Finds all the combos and returns the first one that scores the most points,
+            evaluating them at once on a NumpyBoard.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                budget(:obj:`SearchBudget`): Limits of the combos search, or None.
 
-        self.find_valid_combos(board, combos)  # list is passed as reference to fill it
+            Returns:
+                :obj:`TileCombo`: Best combo, None if nothing can be played.
 
-        if not combos:  # rare condition where nothing can be played with the current hand
+        """
+        combos = list(self.iter_combos(board, budget=budget))
+        if not combos:
             return None
 
-        best_combo = combos[0]
-        best_points = self.get_combo_points(board, best_combo)
+        start_time = time.perf_counter() if self.stats is not None else None
+        points = NumpyBoard(board).get_combos_points(combos)
+        if start_time is not None:
+            self.stats.feature_evaluations += len(combos)
+            self.stats.add_time('batch evaluation', time.perf_counter() - start_time)
+        return combos[int(points.argmax())]
 
-        for combo_option in combos:
-            if self.get_combo_points(board, combo_option) > best_points:
-                best_combo = combo_option # update best combo
-                best_points = self.get_combo_points(board, best_combo) # update its points
 
-        return best_combo
+    def get_hand_combo(self, tile_combo):
+        """ Returns a copy of a combo that plays the hand tiles, the combo tiles are replaced
+            by hand tiles of the same kind. Used for the combos of a cached position, which
+            can be played with other copies of the tiles.
 
+            Args:
+                tile_combo(:obj:`TileCombo`): Combo of a position with the same tile kinds in hand.
 
-    def find_valid_combos(self, board, combos, hand_index = 0, tile_combo = TileCombo()):
-        """ Find all valid plays for a given tile hand and board using backtracking.
+            Returns:
+                :obj:`TileCombo`: Combo with the hand tiles, None if the combo is None.
+
+        """
+        if tile_combo is None:
+            return None
+
+        hand_tiles = list(self.hand)
+        hand_combo = tile_combo.copy()
+        for i, tile in enumerate(tile_combo.tiles):
+            hand_tile = next(hand_tile for hand_tile in hand_tiles if hand_tile.id == tile.id)
+            hand_tiles.remove(hand_tile)
+            hand_combo.tiles[i] = hand_tile
+        return hand_combo
+
+
+    def get_top_k(self, board, k, budget=None):
+        """ Returns the k combos that score the most points, keeping only them in a bounded heap
+            while the search streams the combos. Once the heap is full, runs that can't beat
+            its worst combo are pruned by the search. Ties keep the combo found first.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                k(int): Number of combos to return.
+                budget(:obj:`SearchBudget`): Limits of the search, or None.
+
+            Returns:
+                :obj:`list` of :obj:`TileCombo`: Up to k combos, sorted by descending points.
+
+        """
+        heap = []  # min heap of (points, -found order, combo), its root is the k-th best
+
+        def points_to_beat():
+            return heap[0][0] if len(heap) >= k else None
+
+        for found_order, combo_option in enumerate(self.iter_combos(board, points_to_beat, budget)):
+            points = self.get_carried_points(board, combo_option)
+            if len(heap) < k:
+                heapq.heappush(heap, (points, -found_order, combo_option))
+            elif points > heap[0][0]:
+                heapq.heapreplace(heap, (points, -found_order, combo_option))
+
+        return [combo for points, order, combo in sorted(heap, key=lambda entry: entry[:2], reverse=True)]
+
+
+    def find_combos(self, board, combos):
+        """ Find all valid plays for the current tile hand and board with the bot search method.
             Returns in its argument plays as a list of TileCombo objects.
 
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                combos(:obj:`list` of :obj:`TileCombo`): List of all valid tile combos.
+
+        """
+        combos.extend(self.iter_combos(board))
+
+
+    def iter_combos(self, board, points_to_beat=None, budget=None):
+        """ Yields the valid plays for the current tile hand and board with the bot search method.
+            The lines search yields them lazily, each yielded combo spends a node of the budget
+            and the combos stop when it runs out. The permutations search yields them once its
+            backtracking is finished or stopped by the budget, which it spends by node expanded.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                points_to_beat(function): Returns the points a combo has to exceed to be wanted,
+                    or None to want them all. Only the lines search prunes with it.
+                budget(:obj:`SearchBudget`): Limits of the search, or None.
+
+            Yields:
+                :obj:`TileCombo`: Valid tile combo.
+
+        """
+        if self.search_method == 'permutations':
+            combos = []
+            self.find_valid_combos(board, combos, budget=budget)
+            budget = None  # the backtracking already spent it, every combo it found is yielded
+        else:
+            combos = self.iter_line_combos(board, points_to_beat, budget)
+
+        if self.stats is None and budget is None:
+            yield from combos
+            return
+
+        for tile_combo in combos:
+            if self.stats is not None:
+                self.stats.combos_emitted += 1
+            if budget is not None:
+                budget.combos_found += 1
+            yield tile_combo
+            if budget is not None and budget.spend():
+                return
+
+
+    def iter_line_combos(self, board, points_to_beat=None, budget=None):
+        """ Yields all valid plays for a given tile hand and board placing line-compatible sets
+            of hand tiles as contiguous runs of empty cells. A run is searched from the first
+            anchor (empty cell adjacent to a played tile) it contains, so every distinct
+            placement is found exactly once. Combos carry their points, scored while they are built.
+            Since the points of a run only depend on its cells, runs that can't exceed
+            points_to_beat are skipped before any tile is placed. Runs are searched by
+            increasing length, each one spends a node of the budget.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                points_to_beat(function): Returns the points a combo has to exceed to be wanted,
+                    or None to want them all.
+                budget(:obj:`SearchBudget`): Limits of the search, or None.
+
+            Yields:
+                :obj:`TileCombo`: Valid tile combo.
+
+        """
+        tile_sets = self.get_line_compatible_sets(self.hand)
+        if not tile_sets:
+            return
+
+        # tile sets grouped by length, runs of a length are only filled with sets of that length
+        max_length = len(tile_sets[-1])
+        sets_by_length = [[] for length in range(max_length + 1)]
+        for tile_set in tile_sets:
+            sets_by_length[len(tile_set)].append(tile_set)
+
+        # mask of the hand tiles, cells where none of them is legal can't be part of a run
+        hand_mask = 0
+        for tile_set in sets_by_length[1]:
+            hand_mask |= 1 << tile_set[0].id
+
+        anchor_set = set(self.get_anchor_positions(board))
+        anchors = [anchor for anchor in anchor_set if board.get_legal_tiles(anchor[0], anchor[1]) & hand_mask]
+        # on an empty board runs only differ by their translation, they all start at the anchor
+        anchor_indexes_limit = 1 if board.is_empty() else max_length
+
+        for length in range(1, max_length + 1):
+            if not sets_by_length[length]:
+                continue
+            # best case of a run, a qwirkle in its line and in every cross line
+            points_floor = points_to_beat() if points_to_beat else None
+            if points_floor is not None and line_points[6] * (length + 1) <= points_floor:
+                continue
+            for anchor_row, anchor_col in anchors:
+                # a single tile is the same play in both directions
+                directions = [horizontal] if length == 1 else [horizontal, vertical]
+                for row_step, col_step in directions:
+                    # the anchor can be at any index of the run
+                    for anchor_index in range(min(length, anchor_indexes_limit)):
+                        if budget is not None and budget.spend():
+                            return
+
+                        start_row = anchor_row - anchor_index * row_step
+                        start_col = anchor_col - anchor_index * col_step
+                        cells = [(start_row + i * row_step, start_col + i * col_step) for i in range(length)]
+
+                        # run cells must be empty with a legal hand tile, and the anchor must be
+                        # the first one in the run
+                        valid_run = True
+                        if self.stats is not None:
+                            self.stats.nodes_expanded += 1
+                        for i, cell in enumerate(cells):
+                            if self.stats is not None:
+                                self.stats.positions_tested += 1
+                            if board.get_tile(cell[0], cell[1]) or (i < anchor_index and cell in anchor_set) \
+                                    or not board.get_legal_tiles(cell[0], cell[1]) & hand_mask:
+                                valid_run = False
+                                break
+                        if not valid_run:
+                            continue
+
+                        # played tiles linked to the run ends join its line, cross lines only depend on the cells
+                        last_row, last_col = cells[-1]
+                        linked_tiles = board.get_linked_tiles(start_row, start_col, -row_step, -col_step) + \
+                                       board.get_linked_tiles(last_row, last_col, row_step, col_step)
+                        line_length = length + len(linked_tiles)
+                        if line_length > 6:  # no line is longer than a qwirkle
+                            continue
+                        cross_points = [self.get_cross_line_points(board, row, col, (row_step, col_step)) for row, col in cells]
+
+                        # every arrangement of the run scores the same points
+                        if points_to_beat:
+                            run_points = (line_points[line_length] if line_length > 1 else 0) + sum(cross_points)
+                            points_floor = points_to_beat()
+                            if points_floor is not None and run_points <= points_floor:
+                                continue
+
+                        for tile_set in sets_by_length[length]:
+                            yield from self.place_line(board, tile_set, cells, anchor_index, linked_tiles, cross_points)
+
+
+    def get_line_compatible_sets(self, tiles):
+        """ Returns the subsets of a list of tiles that can be in the same line, that is all
+            the tiles share color or shape and there are no duplicates. Duplicated tiles of the
+            list are considered once, since they produce the same plays.
+
+            Args:
+                tiles(:obj:`list` of :obj:`Tile`): List of tiles.
+
+            Returns:
+                :obj:`list` of :obj:`list` of :obj:`Tile`: Line-compatible subsets sorted by length.
+
+        """
+        unique_tiles = []
+        seen_tiles = set()
+        for tile in tiles:
+            if tile.id not in seen_tiles:
+                seen_tiles.add(tile.id)
+                unique_tiles.append(tile)
+
+        tile_sets = []
+        for subset_mask in range(1, 1 << len(unique_tiles)):
+            subset = [tile for i, tile in enumerate(unique_tiles) if subset_mask >> i & 1]
+            if self.is_valid_line(subset):
+                tile_sets.append(subset)
+
+        tile_sets.sort(key=len)
+        return tile_sets
+
+
+    def get_anchor_positions(self, board):
+        """ Returns the board cells where a combo can start, the empty cells adjacent to
+            at least one played tile, without duplicates.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+
+            Returns:
+                :obj:`list` of :obj:`tuple`: List of (row, col) anchor cells.
+
+        """
+        if board.is_empty():
+            return [(0, 0)]
+        return list(board.frontier)
+
+
+    def get_cross_line_points(self, board, row, col, direction):
+        """ Returns the points of the line crossing a run cell, the line perpendicular to
+            the run made by the cell and the played tiles linked to it.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                row(int): Board row of the cell.
+                col(int): Board column of the cell.
+                direction(tuple): (row step, col step) of the run.
+
+            Returns:
+                int: Cross line points, 0 if no tile is linked to the cell.
+
+        """
+        cross_row_step, cross_col_step = direction[1], direction[0]
+        length = 1 + len(board.get_linked_tiles(row, col, -cross_row_step, -cross_col_step)) + \
+                 len(board.get_linked_tiles(row, col, cross_row_step, cross_col_step))
+        # lines of length 1 are omitted since they aren't combos
+        return line_points[length] if length > 1 else 0
+
+
+    def place_line(self, board, tile_set, cells, anchor_index, linked_tiles, cross_points):
+        """ Yields every valid arrangement of a tile set over a run of empty cells.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                tile_set(:obj:`list` of :obj:`Tile`): Line-compatible tiles, as many as cells.
+                cells(:obj:`list` of :obj:`tuple`): Contiguous (row, col) empty cells of the run.
+                anchor_index(int): Index of the run anchor in cells.
+                linked_tiles(:obj:`list` of :obj:`Tile`): Played tiles linked to the run ends.
+                cross_points(:obj:`list` of int): Cross line points of each cell.
+
+            Yields:
+                :obj:`TileCombo`: Valid tile combo.
+
+        """
+        # main line with the played tiles linked to both ends of the run
+        main_line = tile_set + linked_tiles
+        if not self.is_valid_line(main_line):
+            return
+        main_points = line_points[len(main_line)] if len(main_line) > 1 else 0
+
+        # the board legal tiles of a cell already fit its cross line
+        fitting_tiles = []
+        for row, col in cells:
+            legal_tiles = board.get_legal_tiles(row, col)
+            fitting_tiles.append([tile for tile in tile_set if legal_tiles >> tile.id & 1])
+
+        yield from self.arrange_line(cells, anchor_index, fitting_tiles, cross_points, [], main_points)
+
+
+    def arrange_line(self, cells, anchor_index, fitting_tiles, cross_points, arrangement, points):
+        """ Assigns fitting tiles to the run cells in order using backtracking, adding the
+            points of each cross line as its cell is filled.
+
+            Args:
+                cells(:obj:`list` of :obj:`tuple`): Contiguous (row, col) empty cells of the run.
+                anchor_index(int): Index of the run anchor in cells.
+                fitting_tiles(:obj:`list` of :obj:`list` of :obj:`Tile`): Valid tiles of each cell.
+                cross_points(:obj:`list` of int): Cross line points of each cell.
+                arrangement(:obj:`list` of :obj:`Tile`): Tiles assigned to the first cells.
+                points(int): Points of the main line and the filled cells cross lines.
+
+            Yields:
+                :obj:`TileCombo`: Valid tile combo.
+
+        """
+        if len(arrangement) == len(cells):
+            tile_combo = self.get_run_combo(arrangement, cells, anchor_index)
+            tile_combo.points = points
+            yield tile_combo
+            return
+
+        cell_index = len(arrangement)
+        for tile in fitting_tiles[cell_index]:
+            if not any(tile is placed_tile for placed_tile in arrangement):
+                if self.stats is not None:
+                    self.stats.valid_moves += 1
+                arrangement.append(tile)
+                yield from self.arrange_line(cells, anchor_index, fitting_tiles, cross_points, arrangement,
+                                             points + cross_points[cell_index])
+                arrangement.pop()
+
+
+    @staticmethod
+    def get_run_combo(tiles, cells, anchor_index):
+        """ Creates the combo that plays a tile run. Tiles are played from the anchor to the end
+            of the run and then from the anchor to the start, so every tile is played next to a
+            played one.
+
+            Args:
+                tiles(:obj:`list` of :obj:`Tile`): Tiles of the run in cell order.
+                cells(:obj:`list` of :obj:`tuple`): (row, col) cells of the run.
+                anchor_index(int): Index of the run anchor in cells.
+
+            Returns:
+                :obj:`TileCombo`: Combo that plays the run.
+
+        """
+        tile_combo = TileCombo()
+        play_order = list(range(anchor_index, len(cells))) + list(range(anchor_index - 1, -1, -1))
+        for i in play_order:
+            tile_combo.add_move(tiles[i], Position(cells[i][0], cells[i][1]))
+        return tile_combo
+
+
+    def find_valid_combos(self, board, combos, hand_index = 0, tile_combo = TileCombo(), budget=None):
+        """ Find all valid plays for a given tile hand and board using backtracking.
+            Returns in its argument plays as a list of TileCombo objects. Each expanded node
+            spends a node of the budget, the backtracking stops when it runs out.
+
             Args:
                 board(:obj:`Board`): Board object instance with the current game state.
                 combos(:obj:`list` of :obj:`TileCombo`): List of all valid tile combos.
                 hand_index(int): Current index of the position in the tile hand being verified.
                                  Goes from 0 to the last index in the hand
                 tile_combo(:obj:`TileCombo`): TileCombo object used to permute all the valid solutions.
+                budget(:obj:`SearchBudget`): Limits of the search, or None.
 
         """
         # all tiles were used for a tile_combo solution
         if hand_index >= len(self.hand):
             return
 
+        stats = self.stats
+        if stats is not None:
+            stats.nodes_expanded += 1
+        if budget is not None and budget.spend():
+            return
+
         # look for valid tile moves in the at the current hand index
         for i in range(hand_index, len(self.hand)):
             tile = self.hand[i]
@@ -73,28 +522,42 @@ class Bot:
 
             for playable_position in playable_positions:
 
+                if stats is not None:
+                    stats.positions_tested += 1
+
                 # tile is valid in the playable position?
-                if self.is_valid_move(board.board, tile, playable_position):
+                if self.is_valid_move(board, tile, playable_position):
+                    if stats is not None:
+                        stats.valid_moves += 1
+                        stats.state_saves += 1
+                        stats.state_restores += 1
+
                     # save states to backtrack later
-                    board_state = board.get_state()  # save board state
+                    board.push()  # save board state
                     board.play_tile(tile, playable_position)  # move into board
                     tile_combo.add_move(tile, playable_position)  # move into turn moves
 
                     # at this point we have created a new valid play permutation
                     # this permutation don't use all hand tiles (that is caught in the first if statement)
                     combos.append(tile_combo.copy())  # add valid play
+                    if budget is not None:
+                        budget.combos_found += 1
 
                     # swap to look for all other possible tile moves linked to this one
                     self.swap(self.hand, hand_index, i)
 
                     # search for bigger combos that include the current combo
-                    self.find_valid_combos(board, combos, hand_index + 1, tile_combo)
+                    self.find_valid_combos(board, combos, hand_index + 1, tile_combo, budget)
 
                     # restore previous state / backtrack
-                    board.restore_state(board_state)  # restore board
+                    board.pop()  # restore board
                     tile_combo.discard_last_move()  # restore combo
                     self.swap(self.hand, hand_index, i)  # restore hand
 
+                    # the budget ran out in the bigger combos
+                    if budget is not None and budget.stopped:
+                        return
+
 
     def swap(self, list_, i, j):
         """ Swaps two the values of two positions in a list.
@@ -123,9 +586,8 @@ class Bot:
         # the only playable position on a empty board is (0, 0)
         if board.is_empty():
             return [Position(0, 0)]
-                                                                           # Xrd(1,0) -> Xgr(2,1) -> ★rd(2,4)
-        # current positions of the played tiles of the combo
-        combo_positions = board.get_current_tiles_positions(tile_combo.tiles)
+        # positions of the played tiles of the combo
+        combo_positions = tile_combo.positions
 
         restriction = None
         # if the combo isn't empty there are restrictions
@@ -139,13 +601,14 @@ class Bot:
                 else:
                     restriction = TileRestriction('same col', first_tile_position)
 
-        playable_positions = []
-        # if combo is not empty, search adjacent tiles to the already played tiles
-        # else search adjacent to all the board tiles
-        search_positions = combo_positions if len(tile_combo) >= 1 else board.played_positions
+        # if combo is empty, all the board frontier is playable
+        if len(tile_combo) == 0:
+            return [Position(row, col) for row, col in board.frontier]
 
-        for played_position in search_positions:
-            adjacent_empty_positions = self.get_adjacent_empty_positions(board.board, played_position)
+        playable_positions = []
+        # search adjacent tiles to the already played tiles
+        for played_position in combo_positions:
+            adjacent_empty_positions = self.get_adjacent_empty_positions(board, played_position)
             playable_positions.extend(adjacent_empty_positions)
 
         playable_positions = self.filter_positions(playable_positions, restriction)
@@ -191,7 +654,7 @@ class Bot:
             Looks up, down, right and left of the position.
 
             Args:
-                board(:obj:`list` of :obj:`Tile`): Two-dimensional list of tiles or zeros.
+                board(:obj:`Board`): Board object instance with the current game state.
                 position(:obj:'Position'): Board position of row and column.
 
             Returns:
@@ -202,19 +665,19 @@ class Bot:
         row, col = position.row, position.col
 
         # left empty position?
-        if col > 0 and not board[row][col - 1]:
+        if not board.get_tile(row, col - 1):
             adjacent_empty_positions.append(Position(row, col - 1))
 
         # right empty position?
-        if col < len(board[0]) - 1 and not board[row][col + 1]:
+        if not board.get_tile(row, col + 1):
             adjacent_empty_positions.append(Position(row, col + 1))
 
         # up empty position?
-        if row > 0 and not board[row - 1][col]:
+        if not board.get_tile(row - 1, col):
             adjacent_empty_positions.append(Position(row - 1, col))
 
         # down empty position?
-        if row < len(board) - 1 and not board[row + 1][col]:
+        if not board.get_tile(row + 1, col):
             adjacent_empty_positions.append(Position(row + 1, col))
 
         return adjacent_empty_positions
@@ -224,7 +687,7 @@ class Bot:
         """ Determines if a tile move if valid. Checks vertically and horizontally.
 
             Args:
-                board(:obj:`list` of :obj:`Tile`): Two-dimensional list of tiles or zeros.
+                board(:obj:`Board`): Board object instance with the current game state.
                 tile(:obj:'Tile'): Tile used to know its shape and color.
                 position(:obj:'Position'): Board position of row and column.
 
@@ -235,44 +698,29 @@ class Bot:
         row = position.row
         col = position.col
 
-        if len(board[0]) == 1:
+        # the first tile is played at (0, 0)
+        if board.is_empty():
             valid_position = (row == 0 and col == 0)
             return valid_position
 
-        rows = len(board)
-        cols = len(board[0])
-
-        out_of_index = (row < 0) or (row >= rows) or (col < 0) or (col >= cols)
-        if out_of_index:
-            #print("out of index")
-            return False
-
-        space_taken = board[row][col]
+        space_taken = board.get_tile(row, col)
         if space_taken:
             #print("space taken")
             return False
 
         # at least 1 adjacent tile?
-        adjacent_tile = row != 0 and board[row - 1][col] or \
-                        row != rows - 1 and board[row + 1][col] or \
-                        col != 0 and board[row][col - 1] or \
-                        col != cols - 1 and board[row][col + 1]
+        adjacent_tile = board.get_tile(row - 1, col) or \
+                        board.get_tile(row + 1, col) or \
+                        board.get_tile(row, col - 1) or \
+                        board.get_tile(row, col + 1)
         if not adjacent_tile:
             #print("no adjacent tile")
             return False
 
-        # verify horizontal line
-        horizontal_line = self.get_adjacent_horizontal_line(board, tile, row, col)
-        if not self.is_valid_line(horizontal_line):
-            #print("invalid horizontal line")
-            #print(horizontal_line)
-            return False
-
-        # verify vertical line
-        vertical_line = self.get_adjacent_vertical_line(board, tile, row, col)
-        if not self.is_valid_line(vertical_line):
-            #print("invalid vertical line")
-            #print(vertical_line)
+        # verify horizontal and vertical lines, the board keeps the legal tiles of the cell
+        legal_tiles = board.get_legal_tiles(row, col)
+        if not legal_tiles >> tile.id & 1:
+            #print("invalid line")
             return False
 
         # its a valid move, meets all rules
@@ -284,7 +732,7 @@ class Bot:
             Searches up and down from the given position.
 
             Args:
-                board(:obj:`list` of :obj:`Tile`): Two-dimensional list of tiles or zeros.
+                board(:obj:`Board`): Board object instance with the current game state.
                 tile(:obj:'Tile'): Reference tile to determine the adjacent tiles.
                 row(int): Board row to determine the adjacent tiles.
                 col(int): Board column to determine the adjacent tiles.
@@ -297,14 +745,14 @@ class Bot:
 
         # append right side
         col_index = col + 1
-        while col_index < len(board[0]) and board[row][col_index]:
-            horizontal_line.append(board[row][col_index])
+        while board.get_tile(row, col_index):
+            horizontal_line.append(board.get_tile(row, col_index))
             col_index += 1
 
         # append left side
         col_index = col - 1
-        while col_index >= 0 and board[row][col_index]:
-            horizontal_line.append(board[row][col_index])
+        while board.get_tile(row, col_index):
+            horizontal_line.append(board.get_tile(row, col_index))
             col_index -= 1
         return horizontal_line
 
@@ -314,7 +762,7 @@ class Bot:
             Searches to the right and left from the given position
 
             Args:
-                board(:obj:`list` of :obj:`Tile`): Two-dimensional list of tiles or zeros.
+                board(:obj:`Board`): Board object instance with the current game state.
                 tile(:obj:'Tile'): Reference tile to determine the adjacent tiles.
                 row(int): Board row to determine the adjacent tiles.
                 col(int): Board column to determine the adjacent tiles.
@@ -327,21 +775,22 @@ class Bot:
 
         # append upper side
         row_index = row + 1
-        while row_index < len(board) and board[row_index][col]:
-            vertical_line.append(board[row_index][col])
+        while board.get_tile(row_index, col):
+            vertical_line.append(board.get_tile(row_index, col))
             row_index += 1
 
         # append lower side
         row_index = row - 1
-        while row_index >= 0 and board[row_index][col]:
-            vertical_line.append(board[row_index][col])
+        while board.get_tile(row_index, col):
+            vertical_line.append(board.get_tile(row_index, col))
             row_index -= 1
         return vertical_line
 
 
     def is_valid_line(self, line):
         """ Indicates if a line of tiles is valid. A line is valid when
-            all the tiles share either shape or color.
+            all the tiles share either shape or color, without duplicates.
+            The line mask is looked up in the precomputed valid lines.
 
             Args:
                 line(:obj:`list` of :obj:`Tile`): The first parameter.
@@ -350,42 +799,7 @@ class Bot:
                 True if the line is valid, false otherwise.
 
         """
-        # lines of 1 or 0 tiles are valid
-        if len(line) <= 1:
-            return True
-
-        # use first two tiles to determine common aspect
-        common_aspect = None
-        common_value = None
-        if line[0].shape == line[1].shape:
-            common_aspect = 'shape'
-            common_value = line[0].shape
-        if line[0].color == line[1].color:
-            common_aspect = 'color'
-            common_value = line[0].color
-
-        # first 2 tiles are incompatible
-        if not common_aspect:
-            return False
-
-        # set to look for duplicates
-        seen_tiles = set()
-        for tile in line:
-            # duplicate tile?
-            duplicate = str(tile) in seen_tiles
-
-            # has same color or shape as the rest of the line?
-            invalid_tile = False
-            if common_aspect == 'shape':
-                invalid_tile = tile.shape != common_value
-            else:
-                invalid_tile = tile.color != common_value
-
-            if duplicate or invalid_tile:
-                return False
-            else:
-                seen_tiles.add(str(tile))
-        return True
+        return is_valid_line_mask(get_line_mask(line))
 
 
     def get_combo_points(self, board_object, tile_combo):
@@ -399,37 +813,69 @@ class Bot:
                 int: Turn steps' points.
 
         """
-        board_state = board_object.get_state()  # save to restore later
+        start_time = time.perf_counter() if self.stats is not None else None
+        board_object.push()  # save to restore later
 
         self.play_combo(board_object, tile_combo)
-        # recover the updated positions of the played tiles
-        played_positions = board_object.get_current_tiles_positions(tile_combo.tiles)
+        points = self.get_played_combo_points(board_object, tile_combo)
+
+        board_object.pop()
+        if start_time is not None:
+            self.stats.state_saves += 1
+            self.stats.state_restores += 1
+            self.stats.add_time('scoring', time.perf_counter() - start_time)
+        return points
 
-        board = board_object.board
+
+    def get_played_combo_points(self, board_object, tile_combo):
+        """ Calculates the total points of a tile turn combo already played on the board.
+
+            Args:
+                board_object(:obj:`Board`): Board object instance with the combo played.
+                tile_combo(:obj:`TileCombo`): Tile movements made by a player.
+
+            Returns:
+                int: Turn steps' points.
+
+        """
         points = 0
-        seen_lines = [] # list of lines as python sets
+        seen_lines = set() # lines by direction and first cell
         for step_index in range(len(tile_combo)):
             played_tile = tile_combo.tiles[step_index]
-            played_pos = played_positions[step_index]
-
-            horizontal_line = self.get_adjacent_horizontal_line(board, played_tile, played_pos.row, played_pos.col)
-            line_set = set(horizontal_line)
-            # lines of length 1 are omitted since they aren't combos
-            # seen lines are omitted to avoid counting twice the same line points
-            if len(line_set) > 1 and not line_set in seen_lines:
-                seen_lines.append(line_set) # append to seen lines
-                points += self.get_tile_line_points(line_set) # add points
-
-            vertical_line = self.get_adjacent_vertical_line(board, played_tile, played_pos.row, played_pos.col)
-            line_set = set(vertical_line)
-            if len(line_set) > 1 and not line_set in seen_lines:
-                seen_lines.append(line_set)
-                points += self.get_tile_line_points(line_set)
-
-        board_object.restore_state(board_state)
+            played_pos = tile_combo.positions[step_index]
+
+            for row_step, col_step in (horizontal, vertical):
+                before = board_object.get_linked_tiles(played_pos.row, played_pos.col, -row_step, -col_step)
+                after = board_object.get_linked_tiles(played_pos.row, played_pos.col, row_step, col_step)
+                # lines of length 1 are omitted since they aren't combos
+                if not before and not after:
+                    continue
+
+                # seen lines are omitted to avoid counting twice the same line points
+                line_start = (row_step, played_pos.row - len(before) * row_step, played_pos.col - len(before) * col_step)
+                if line_start not in seen_lines:
+                    seen_lines.add(line_start)
+                    points += get_line_points(get_line_mask(before + after + [played_tile]))
         return points
 
 
+    def get_carried_points(self, board, tile_combo):
+        """ Returns the points a combo carries from the search, or calculates them
+            if it doesn't carry them.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                tile_combo(:obj:`TileCombo`): Tile movements made by a player.
+
+            Returns:
+                int: Turn steps' points.
+
+        """
+        if tile_combo.points is not None:
+            return tile_combo.points
+        return self.get_combo_points(board, tile_combo)
+
+
     @staticmethod
     def play_combo(board, tile_combo):
         """ Plays all the moves in a tile_combo object on a given board.
@@ -457,11 +903,7 @@ class Bot:
                 int: Tile line' points.
 
         """
-        if len(tile_line) == 6:
-            #print("qwirkle")
-            return 12
-        else:
-            return len(tile_line)
+        return line_points[len(tile_line)]
 
 
     def draw_tiles(self, bag):
@@ -500,6 +942,11 @@ class Bot:
             self.hand.remove(tile)
 
 
+    def close(self):
+        """ Releases the resources held by the bot, this bot doesn't hold any.
+        """
+
+
     def __str__(self):
         return "Points bot: " + str(self.points) + "pts " + str(self.hand)
 
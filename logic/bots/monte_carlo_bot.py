@@ -0,0 +1,234 @@
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from logic.bots.bot import Bot
+from logic.combos.position import Position
+from logic.combos.tile_combo import TileCombo
+from logic.game import Game
+from logic.game_objects.bag import Bag
+from logic.game_objects.board import Board
+from logic.tiles.tile import get_tiles_by_id, tiles_from_bytes, tiles_to_bytes
+
+
+def play_rollouts(board_bytes, hand_bytes, combo_moves, combo_points, unseen_bytes, rollouts, rollout_turns, seed):
+    """ Plays rollouts of a combo: the combo is played, the opponent hand and the bag are sampled
+        from the unseen tiles, and two points bots play the next turns, the opponent first.
+        Runs in the rollout worker processes, so it only receives and returns plain values.
+
+        Args:
+            board_bytes(bytes): Board encoding, see Board.to_bytes.
+            hand_bytes(bytes): Tiles left in the hand after the combo, see tiles_to_bytes.
+            combo_moves(:obj:`list` of tuple): Row, column and tile id of the combo moves.
+            combo_points(int): Points scored by the combo.
+            unseen_bytes(bytes): Tiles of the opponent hand and the bag, see tiles_to_bytes.
+            rollouts(int): Number of rollouts.
+            rollout_turns(int): Turns played after the combo in each rollout.
+            seed(int): Seed of the samples.
+
+        Returns:
+            :obj:`list` of int: Point margin of the bot over the opponent in each rollout,
+                                counting the combo points.
+
+    """
+    rng = random.Random(seed)
+    board = Board.from_bytes(board_bytes)
+    combo = TileCombo()
+    for (row, col, tile_id), tile in zip(combo_moves, get_tiles_by_id(tile_id for row, col, tile_id in combo_moves)):
+        combo.add_move(tile, Position(row, col))
+    hand = tiles_from_bytes(hand_bytes)
+    unseen_tiles = tiles_from_bytes(unseen_bytes)
+
+    margins = []
+    for rollout in range(rollouts):
+        board.push()  # the rollout turns are undone, the board is reused by the next one
+        Bot.play_combo(board, combo)
+        bag = Bag(rng, tiles=unseen_tiles)
+        opponent = Bot()
+        opponent.draw_tiles(bag)
+        bot = Bot()
+        bot.hand = list(hand)
+        bot.draw_tiles(bag)
+        if bot.out_of_tiles():
+            bot.points += Game.finish_bonus
+        else:
+            Game([opponent, bot], bag, board, deal=False).play_to_end(rollout_turns)
+        margins.append(combo_points + bot.points - opponent.points)
+        board.pop()
+    return margins
+
+
+class MonteCarloBot(Bot):
+    """ Bot that plays the top points combos in rollouts against sampled opponent hands
+        and plays the one with the best average point margin. Rollouts run in a pool of
+        processes for a time budget, each one plays the next turns with points bots.
+
+        Attributes:
+            hand(:obj:`list` of :obj:`Tile`): List of playable tiles.
+            points(int): Bot current points.
+            candidates(int): Number of top points combos played in rollouts.
+            rollout_time(float): Seconds of rollouts in each turn.
+            rollout_turns(int): Turns played after the combo in each rollout.
+            rollouts_per_task(int): Rollouts played by a worker process at once.
+            workers(int): Number of rollout processes, one per core if None. 1 plays them in this process.
+            rollouts(int): Rollouts played in all the turns.
+            rollouts_time(float): Seconds spent in rollouts in all the turns.
+            last_margins(:obj:`list` of float): Average margin of each candidate in the last turn.
+    """
+
+
+    def __init__(self, search_method='lines', cache=None, evaluator='scalar', candidates=4, rollout_time=1.0,
+                 rollout_turns=2, rollouts_per_task=8, workers=None, seed=None):
+        """ The constructor receives the Bot arguments and the rollouts settings.
+
+            Args:
+                search_method(str): Combo search used, 'lines' or 'permutations'.
+                cache(:obj:`TranspositionCache`): Cache checked before searching a position.
+                evaluator(str): Combo evaluation used, 'scalar' or 'numpy'.
+                candidates(int): Number of top points combos played in rollouts.
+                rollout_time(float): Seconds of rollouts in each turn, a search deadline can shorten them.
+                rollout_turns(int): Turns played after the combo in each rollout.
+                rollouts_per_task(int): Rollouts played by a worker process at once.
+                workers(int): Number of rollout processes, one per core if None. 1 plays them in this process.
+                seed(int): Seed of the rollout samples.
+
+        """
+        super().__init__(search_method, cache, evaluator)
+        self.candidates = candidates
+        self.rollout_time = rollout_time
+        self.rollout_turns = rollout_turns
+        self.rollouts_per_task = rollouts_per_task
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.rng = random.Random(seed)
+        self.executor = None
+        self.rollouts = 0
+        self.rollouts_time = 0.0
+        self.last_margins = []
+
+
+    def decide_combo(self, board, budget=None):
+        """ Returns the top points combo with the best average margin in the rollouts.
+            Every candidate gets at least one task of rollouts, even out of time.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                budget(:obj:`SearchBudget`): Limits of the search, or None.
+
+            Returns:
+                :obj:`TileCombo`: Best combo, None if nothing can be played.
+
+        """
+        candidates = self.get_top_k(board, self.candidates, budget)
+        self.last_margins = []
+        if len(candidates) < 2:
+            return candidates[0] if candidates else None
+
+        start_time = time.perf_counter()
+        deadline = start_time + self.rollout_time
+        if budget is not None and budget.deadline is not None:
+            deadline = min(deadline, budget.deadline)
+
+        tasks = self.get_rollout_tasks(board, candidates)
+        margins = [[] for candidate in candidates]
+        if self.workers == 1:
+            task_number = 0
+            while task_number < len(candidates) or time.perf_counter() < deadline:
+                candidate_index = task_number % len(candidates)
+                margins[candidate_index].extend(play_rollouts(*tasks[candidate_index], self.rng.getrandbits(64)))
+                task_number += 1
+        else:
+            self.run_rollout_tasks(tasks, margins, deadline)
+
+        elapsed_time = time.perf_counter() - start_time
+        self.rollouts += sum(len(candidate_margins) for candidate_margins in margins)
+        self.rollouts_time += elapsed_time
+        if self.stats is not None:
+            self.stats.add_time('rollouts', elapsed_time)
+
+        self.last_margins = [sum(candidate_margins) / len(candidate_margins) for candidate_margins in margins]
+        # ties keep the combo that scores the most points
+        best_index = max(range(len(candidates)), key=lambda index: (self.last_margins[index], -index))
+        return candidates[best_index]
+
+
+    def get_rollout_tasks(self, board, candidates):
+        """ Returns the arguments of play_rollouts for each candidate, but the seed. The unseen
+            tiles are the ones out of the board and the bot hand, in the bag or the opponent hand.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                candidates(:obj:`list` of :obj:`TileCombo`): Combos played in rollouts.
+
+            Returns:
+                :obj:`list` of tuple: Rollout arguments by candidate.
+
+        """
+        board_bytes = board.to_bytes()
+        unseen_counts = [3] * 36
+        for tile in list(board.tiles.values()) + self.hand:
+            unseen_counts[tile.id] -= 1
+        unseen_bytes = bytes(tile_id for tile_id in range(36) for copy in range(max(unseen_counts[tile_id], 0)))
+
+        tasks = []
+        for combo in candidates:
+            hand_bytes = tiles_to_bytes([tile for tile in self.hand if not any(tile is played for played in combo.tiles)])
+            combo_moves = [(position.row, position.col, tile.id) for tile, position in zip(combo.tiles, combo.positions)]
+            tasks.append((board_bytes, hand_bytes, combo_moves, self.get_carried_points(board, combo), unseen_bytes,
+                          self.rollouts_per_task, self.rollout_turns))
+        return tasks
+
+
+    def run_rollout_tasks(self, tasks, margins, deadline):
+        """ Plays rollout tasks in the process pool, cycling over the candidates and keeping
+            every process busy until the deadline. Collects the margins of each candidate.
+
+            Args:
+                tasks(:obj:`list` of tuple): Rollout arguments by candidate, see get_rollout_tasks.
+                margins(:obj:`list` of :obj:`list`): Rollout margins by candidate.
+                deadline(float): time.perf_counter() value when no more tasks are submitted.
+
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        task_number = 0
+        pending = {}
+
+        def submit():
+            nonlocal task_number
+            candidate_index = task_number % len(tasks)
+            future = self.executor.submit(play_rollouts, *tasks[candidate_index], self.rng.getrandbits(64))
+            pending[future] = candidate_index
+            task_number += 1
+
+        for task in range(max(len(tasks), 2 * self.workers)):
+            submit()
+        while pending:
+            done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                margins[pending.pop(future)].extend(future.result())
+                if time.perf_counter() < deadline:
+                    submit()
+
+
+    def get_rollouts_per_second(self):
+        """ Returns the rollouts played per second of rollouts over all the turns.
+
+            Returns:
+                float: Rollouts per second, 0 before any rollout.
+
+        """
+        return self.rollouts / self.rollouts_time if self.rollouts_time else 0.0
+
+
+    def close(self):
+        """ Shuts down the rollout processes, a new pool is started if the bot plays again.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+    def __str__(self):
+        return "Monte Carlo bot: " + str(self.points) + "pts " + str(self.hand)
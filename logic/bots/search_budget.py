@@ -0,0 +1,48 @@
+import time
+
+
+class SearchBudget:
+    """ Limits of an anytime search, a deadline and a number of search nodes. The search
+        keeps going until it finds a combo, so it always has one to play when it stops.
+
+        Attributes:
+            deadline(float): time.perf_counter() value when the search has to stop, or None.
+            node_budget(int): Number of search nodes the search can expand, or None.
+            nodes(int): Search nodes spent.
+            combos_found(int): Combos found by the search.
+            stopped(bool): Indicates if the search was stopped before finishing.
+
+    """
+
+
+    def __init__(self, deadline=None, node_budget=None):
+        """ The constructor receives the limits, a search without them is never stopped.
+
+            Args:
+                deadline(float): time.perf_counter() value when the search has to stop.
+                node_budget(int): Number of search nodes the search can expand.
+
+        """
+        self.deadline = deadline
+        self.node_budget = node_budget
+        self.nodes = 0
+        self.combos_found = 0
+        self.stopped = False
+
+
+    def spend(self, nodes=1):
+        """ Spends search nodes and indicates if the search has to stop, that is when the budget
+            ran out and a combo was already found.
+
+            Args:
+                nodes(int): Search nodes expanded.
+
+            Returns:
+                bool: True if the search has to stop, false otherwise.
+
+        """
+        self.nodes += nodes
+        if not self.stopped and self.combos_found:
+            self.stopped = (self.node_budget is not None and self.nodes > self.node_budget) or \
+                           (self.deadline is not None and time.perf_counter() >= self.deadline)
+        return self.stopped
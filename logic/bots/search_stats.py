@@ -0,0 +1,115 @@
+class SearchStats:
+    """ Counters and cumulative phase times of the searches of a bot. Bots only
+        collect them when their stats attribute is set to an instance.
+
+        Attributes:
+            nodes_expanded(int): Search nodes expanded, runs tried by the lines search and
+                partial combos extended by the backtracking searches.
+            positions_tested(int): Board cells tested for a tile.
+            valid_moves(int): Tiles placed in a cell where they are valid.
+            combos_emitted(int): Valid combos found by the search.
+            state_saves(int): Board checkpoints saved to evaluate or backtrack moves.
+            state_restores(int): Board checkpoints restored.
+            feature_evaluations(int): Combos whose features were evaluated.
+            phase_times(:obj:`dict`): Cumulative seconds by phase: 'search' for whole
+                decisions, 'scoring', 'features', 'batch evaluation' and 'rollouts' inside them.
+
+    """
+
+    counter_names = ('nodes_expanded', 'positions_tested', 'valid_moves', 'combos_emitted',
+                     'state_saves', 'state_restores', 'feature_evaluations')
+
+    def __init__(self):
+        """ The constructor initiates the counters in zero.
+        """
+        for name in self.counter_names:
+            setattr(self, name, 0)
+        self.phase_times = {}
+
+
+    def add_time(self, phase, seconds):
+        """ Adds time to a phase.
+
+            Args:
+                phase(str): Phase name.
+                seconds(float): Elapsed seconds.
+
+        """
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + seconds
+
+
+    def merge(self, other):
+        """ Adds the counters and phase times of other stats to these ones.
+
+            Args:
+                other(:obj:`SearchStats`): Stats to add.
+
+        """
+        for name in self.counter_names:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for phase, seconds in other.phase_times.items():
+            self.add_time(phase, seconds)
+
+
+    def copy(self):
+        """ Creates a copy of the instance.
+
+        """
+        copy = SearchStats()
+        copy.merge(self)
+        return copy
+
+
+    def as_dict(self):
+        """ Returns the counters and phase times as plain values. The generation time is
+            the search time not spent in the evaluation phases.
+
+            Returns:
+                :obj:`dict`: Counters by name and 'phase_times' with seconds by phase.
+
+        """
+        phase_times = dict(self.phase_times)
+        if 'search' in phase_times:
+            evaluation_time = sum(seconds for phase, seconds in phase_times.items() if phase != 'search')
+            phase_times['generation'] = max(phase_times['search'] - evaluation_time, 0.0)
+        stats = {name: getattr(self, name) for name in self.counter_names}
+        stats['phase_times'] = phase_times
+        return stats
+
+
+    @classmethod
+    def from_dict(cls, stats_dict):
+        """ Creates stats from the plain values returned by as_dict.
+
+            Args:
+                stats_dict(:obj:`dict`): Counters and phase times.
+
+            Returns:
+                :obj:`SearchStats`: Stats with the values.
+
+        """
+        stats = cls()
+        for name in cls.counter_names:
+            setattr(stats, name, stats_dict.get(name, 0))
+        stats.phase_times = {phase: seconds for phase, seconds in stats_dict.get('phase_times', {}).items()
+                             if phase != 'generation'}
+        return stats
+
+
+    def __sub__(self, other):
+        """ Returns the stats collected since a copy of the instance was made.
+
+        """
+        difference = SearchStats()
+        for name in self.counter_names:
+            setattr(difference, name, getattr(self, name) - getattr(other, name))
+        for phase, seconds in self.phase_times.items():
+            difference.phase_times[phase] = seconds - other.phase_times.get(phase, 0.0)
+        return difference
+
+
+    def __str__(self):
+        stats = self.as_dict()
+        phase_times = stats.pop('phase_times')
+        return ', '.join(name + ' ' + str(value) for name, value in stats.items()) + \
+               ''.join(', %s %.4fs' % (phase, seconds) for phase, seconds in sorted(phase_times.items()))
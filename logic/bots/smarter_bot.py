@@ -1,4 +1,7 @@
+import time
+
 from logic.bots.bot import Bot
+from logic.game_objects.numpy_board import NumpyBoard
 
 
 class SmarterBot(Bot):
@@ -11,72 +14,138 @@ class SmarterBot(Bot):
     """
 
 
-    def get_best_combo(self, board):
+    def decide_combo(self, board, budget=None):
         """ Returns the smartest tile combo it founds for a turn.
 
             Args:
                 board(:obj:`Board`): Board object instance with the current game state.
+                budget(:obj:`SearchBudget`): Limits of the search, or None.
 
             Returns:
                 :obj:`TileCombo`: Smartest combo found.
 
         """
-        combos = []  # list of TileCombo objects
+        if self.evaluator == 'numpy':
+            return self.get_best_batch_combo(board, budget)
+
+        # combos features are evaluated once and hold for efficiency, only while the combo
+        # can still be picked
+        features = {}
+        smartest_combo = None
+
+        for combo_option in self.iter_combos(board, budget=budget):
+            if smartest_combo is None:
+                smartest_combo = combo_option
+                continue
+            smarter_combo = self.pick_smarter_combo(board, smartest_combo, combo_option, features)
+            features.pop(combo_option if smarter_combo is smartest_combo else smartest_combo, None)
+            smartest_combo = smarter_combo
 
-        self.find_valid_combos(board, combos)  # list is passed as reference to fill it
+        #print(smartest_combo)
+        return smartest_combo  # None in the rare condition where nothing can be played
 
-        if not combos:  # rare condition where nothing can be played with the current hand
-            return None
 
-        # Smartest combo properties are hold for efficiency
-        smartest_combo = combos[0]
-        smart_points = self.get_combo_points(board, smartest_combo)
-        smart_chances = self.get_qwirkle_chances_caused(board, smartest_combo)
-        smart_kills = self.get_possible_lines_killed(board, smartest_combo)
+    def get_best_batch_combo(self, board, budget=None):
+        """ Finds all the combos and returns the smartest one, evaluating their features at once
+            on a NumpyBoard. Picks the same combo as pick_smarter_combo over the combos in order,
+            the last one of those that cause the least chances, score the most points and kill
+            the least lines.
 
-        for combo_option in combos:
-            smartest_combo = self.pick_smarter_combo(board, smartest_combo, smart_points, smart_chances, smart_kills, combo_option)
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                budget(:obj:`SearchBudget`): Limits of the combos search, or None.
 
-            # update smartest combo properties if combo changed
-            if smartest_combo == combo_option:
-                smart_points = self.get_combo_points(board, smartest_combo)
-                smart_chances = self.get_qwirkle_chances_caused(board, smartest_combo)
-                smart_kills = self.get_possible_lines_killed(board, smartest_combo)
+            Returns:
+                :obj:`TileCombo`: Smartest combo, None if nothing can be played.
 
-        #print(smartest_combo)
-        return smartest_combo
+        """
+        combos = list(self.iter_combos(board, budget=budget))
+        if not combos:
+            return None
+
+        start_time = time.perf_counter() if self.stats is not None else None
+        chances, points, kills = NumpyBoard(board).get_combos_features(combos)
+        if start_time is not None:
+            self.stats.feature_evaluations += len(combos)
+            self.stats.add_time('batch evaluation', time.perf_counter() - start_time)
+        smartest = chances == chances.min()
+        smartest &= points == points[smartest].max()
+        smartest &= kills == kills[smartest].min()
+        return combos[int(smartest.nonzero()[0][-1])]
 
 
-    def pick_smarter_combo(self, board, combo1, points1, chances1, kills1, combo2):
+    def pick_smarter_combo(self, board, combo1, combo2, features):
         """ Picks the smarter combo between two options. In descending order of smartness are
             considered: less qwirkle chances caused, more combo points and less possible lines killed.
+            Lines killed are only evaluated when the combos tie on chances and points.
 
             Args:
                 board(:obj:`Board`): Board object instance with the current game state.
                 combo1(:obj:`TileCombo`): First combo option.
-                points1(int): First combo points.
-                chances1(int): First combo qwirkle chances caused.
-                kills1(int): First combo possible lines killed.
                 combo2(:obj:`TileCombo`): Second combo option.
+                features(:obj:`dict`): Memoized combo features, see get_combo_features.
 
             Returns:
                 :obj:`TileCombo`: Smarter combo option.
 
         """
-        points2 = self.get_combo_points(board, combo2)
-        chances2 = self.get_qwirkle_chances_caused(board, combo2)
-        kills2 = self.get_possible_lines_killed(board, combo2)
+        chances1, points1, kills1 = self.get_combo_features(board, combo1, features, with_kills=False)
+        chances2, points2, kills2 = self.get_combo_features(board, combo2, features, with_kills=False)
+
+        if chances2 != chances1:
+            return combo2 if chances2 < chances1 else combo1
+        if points2 != points1:
+            return combo2 if points2 > points1 else combo1
+
+        kills1 = self.get_combo_features(board, combo1, features)[2]
+        kills2 = self.get_combo_features(board, combo2, features)[2]
+        return combo2 if kills2 <= kills1 else combo1
+
+
+    def get_combo_features(self, board, tile_combo, features=None, with_kills=True):
+        """ Returns the qwirkle chances caused, points and possible lines killed of a combo.
+            All of them are evaluated in a single pass that plays the combo on the board.
+            Features are memoized by combo, lines killed only once they are requested.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                tile_combo(:obj:`TileCombo`): Tile movements made by a player.
+                features(:obj:`dict`): Memoized features by combo.
+                with_kills(bool): Evaluate the possible lines killed, otherwise they can be None.
+
+            Returns:
+                tuple: Qwirkle chances caused, points and possible lines killed.
+
+        """
+        combo_features = features.get(tile_combo) if features is not None else None
+        if combo_features is not None and (not with_kills or combo_features[2] is not None):
+            return combo_features
+
+        start_time = time.perf_counter() if self.stats is not None else None
+        board.push()  # save to restore later
 
-        smarter = combo1
+        if combo_features is None:
+            chances = self.play_counting_chances(board, tile_combo)
+            points = tile_combo.points
+            if points is None:
+                points = self.get_played_combo_points(board, tile_combo)
+        else:
+            self.play_combo(board, tile_combo)
+            chances, points = combo_features[0], combo_features[1]
 
-        if chances2 < chances1:
-            smarter = combo2
-        elif points2 > points1 and chances2 == chances1:
-            smarter = combo2
-        elif points2 == points1 and kills2 <= kills1 and chances2 == chances1:
-            smarter = combo2
+        kills = self.get_played_lines_killed(board, tile_combo) if with_kills else None
 
-        return smarter
+        board.pop()
+        if start_time is not None:
+            self.stats.feature_evaluations += 1
+            self.stats.state_saves += 1
+            self.stats.state_restores += 1
+            self.stats.add_time('features', time.perf_counter() - start_time)
+
+        combo_features = (chances, points, kills)
+        if features is not None:
+            features[tile_combo] = combo_features
+        return combo_features
 
 
     def get_qwirkle_chances_caused(self, board, tile_combo):
@@ -84,23 +153,38 @@ class SmarterBot(Bot):
             A qwirkle chance is caused when a tile line is left with 5 tiles.
 
             Args:
-                board_object(:obj:`Board`): Board object instance with the current game state.
+                board(:obj:`Board`): Board object instance with the current game state.
                 tile_combo(:obj:`TileCombo`): Tile movements made by a player.
 
             Returns:
-                int: Number of lines killed.
+                int: Number of qwirkle chances caused.
 
         """
-        board_state = board.get_state() # save to restore later
+        board.push() # save to restore later
+        chances = self.play_counting_chances(board, tile_combo)
+        board.pop()
+        return chances
+
+
+    def play_counting_chances(self, board, tile_combo):
+        """ Plays a combo on the board counting the qwirkle chances caused by its moves.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+                tile_combo(:obj:`TileCombo`): Tile movements made by a player.
 
+            Returns:
+                int: Number of qwirkle chances caused.
+
+        """
         chances = 0
         for step_index in range(len(tile_combo)): # iterate all turn steps
             tile = tile_combo.tiles[step_index]
             pos = tile_combo.positions[step_index]
 
             # the length of the linked vertical and horizontal combos are the reference
-            horizontal_combo = len(self.get_adjacent_horizontal_line(board.board, tile, pos.row, pos.col))
-            vertical_combo = len(self.get_adjacent_vertical_line(board.board, tile, pos.row, pos.col))
+            horizontal_combo = len(self.get_adjacent_horizontal_line(board, tile, pos.row, pos.col))
+            vertical_combo = len(self.get_adjacent_vertical_line(board, tile, pos.row, pos.col))
 
             # when a qwirkle is made and chances are more than zero means
             # the player placed the 5th and 6th tile in the line.
@@ -118,49 +202,58 @@ class SmarterBot(Bot):
                 chances += 1
 
             board.play_tile(tile_combo.tiles[step_index], tile_combo.positions[step_index])
-
-        board.restore_state(board_state)
         return chances
 
 
-    def get_possible_lines_killed(self, board_object, tile_combo):
+    def get_possible_lines_killed(self, board, tile_combo):
         """ Counts the possible lines killed by a given set of tile movements.
             A line is killed when a line could have been linked between the played tile and another
             tile towards a direction (separated by empty cells) but due to the color or shape of
             the played tile it isn't a valid line of tiles.
 
             Args:
-                board_object(:obj:`Board`): Board object instance with the current game state.
+                board(:obj:`Board`): Board object instance with the current game state.
                 tile_combo(:obj:`TileCombo`): Tile movements made by a player.
 
             Returns:
                 int: Number of lines killed.
 
         """
-        lines_killed = 0 # can be 4 max, because of the 4 directions
-        board_state = board_object.get_state()  # save to restore later
+        board.push()  # save to restore later
+        self.play_combo(board, tile_combo)
+        lines_killed = self.get_played_lines_killed(board, tile_combo)
+        board.pop()
+        return lines_killed
+
+
+    def get_played_lines_killed(self, board, tile_combo):
+        """ Counts the possible lines killed by a set of tile movements already played on the board.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the combo played.
+                tile_combo(:obj:`TileCombo`): Tile movements made by a player.
 
-        self.play_combo(board_object, tile_combo)
-        # recover the updated final positions of the played tiles
-        updated_positions = board_object.played_positions[(len(board_object.played_positions) - len(tile_combo)):]
+            Returns:
+                int: Number of lines killed.
 
-        board = board_object.board # the 2d array of lists
+        """
+        lines_killed = 0 # can be 4 max, because of the 4 directions
         for step_index in range(len(tile_combo)):
             tile = tile_combo.tiles[step_index]
-            pos = updated_positions[step_index]
+            pos = tile_combo.positions[step_index]
 
             # the adjacent cell in that direction has to be empty (0) to evaluate a possible killed line
             # search to the left
-            if pos.col > 1 and board[pos.row][pos.col - 1] == 0:
+            if board.get_tile(pos.row, pos.col - 1) == 0:
                 col = pos.col - 2 # column index moved to search a tile
                 cells_traversed = 1 # if 5 cells empty are traversed a line isn't possible in that direction
-                while col > 0 and cells_traversed < 5:
-                    tile_found = (board[pos.row][col] != 0)
+                while cells_traversed < 5:
+                    tile_found = (board.get_tile(pos.row, col) != 0)
                     if tile_found:
                         # the line linked to the played tile
                         line = self.get_adjacent_horizontal_line(board, tile, pos.row, pos.col)
                         # the line linked to the found found is appended to the line
-                        line.extend(self.get_adjacent_horizontal_line(board, board[pos.row][col], pos.row, col))
+                        line.extend(self.get_adjacent_horizontal_line(board, board.get_tile(pos.row, col), pos.row, col))
                         possible_line_len = len(line) + cells_traversed # possible line can be length 6 max to be valid
                         if possible_line_len <= 6 and not self.is_valid_line(line) and cells_traversed != 1:
                             lines_killed += 1 # line to the left killed
@@ -169,14 +262,14 @@ class SmarterBot(Bot):
                     cells_traversed += 1
 
             # search to the right
-            if pos.col + 1 < len(board[0]) and board[pos.row][pos.col + 1] == 0:
+            if board.get_tile(pos.row, pos.col + 1) == 0:
                 col = pos.col + 2 # column index moved to search a tile
                 cells_traversed = 1
-                while col < len(board[0]) and cells_traversed < 5:
-                    tile_found = (board[pos.row][col] != 0)
+                while cells_traversed < 5:
+                    tile_found = (board.get_tile(pos.row, col) != 0)
                     if tile_found:
                         line = self.get_adjacent_horizontal_line(board, tile, pos.row, pos.col)
-                        line.extend(self.get_adjacent_horizontal_line(board, board[pos.row][col], pos.row, col))
+                        line.extend(self.get_adjacent_horizontal_line(board, board.get_tile(pos.row, col), pos.row, col))
                         possible_line_len = len(line) + cells_traversed
                         if possible_line_len <= 6 and not self.is_valid_line(line) and cells_traversed != 1:
                             lines_killed += 1 # line to the right killed
@@ -185,14 +278,14 @@ class SmarterBot(Bot):
                     cells_traversed += 1
 
             # search up
-            if pos.row > 1 and board[pos.row - 1][pos.col] == 0:
+            if board.get_tile(pos.row - 1, pos.col) == 0:
                 row = pos.row - 2 # row index moved to search a tile
                 cells_traversed = 1
-                while row > 0 and cells_traversed < 5:
-                    tile_found = (board[row][pos.col] != 0)
+                while cells_traversed < 5:
+                    tile_found = (board.get_tile(row, pos.col) != 0)
                     if tile_found:
                         line = self.get_adjacent_vertical_line(board, tile, pos.row, pos.col)
-                        line.extend(self.get_adjacent_vertical_line(board, board[row][pos.col], row, pos.col))
+                        line.extend(self.get_adjacent_vertical_line(board, board.get_tile(row, pos.col), row, pos.col))
                         possible_line_len = len(line) + cells_traversed
                         if possible_line_len <= 6 and not self.is_valid_line(line) and cells_traversed != 1:
                             lines_killed += 1 # line up killed
@@ -202,22 +295,20 @@ class SmarterBot(Bot):
 
 
             # search down
-            if pos.row + 1 < len(board) and board[pos.row + 1][pos.col] == 0:
+            if board.get_tile(pos.row + 1, pos.col) == 0:
                 row = pos.row + 2 # row index moved to search a tile
                 cells_traversed = 1
-                while row < len(board) and cells_traversed < 5:
-                    tile_found = (board[row][pos.col] != 0)
+                while cells_traversed < 5:
+                    tile_found = (board.get_tile(row, pos.col) != 0)
                     if tile_found:
                         line = self.get_adjacent_vertical_line(board, tile, pos.row, pos.col)
-                        line.extend(self.get_adjacent_vertical_line(board, board[row][pos.col], row, pos.col))
+                        line.extend(self.get_adjacent_vertical_line(board, board.get_tile(row, pos.col), row, pos.col))
                         possible_line_len = len(line) + cells_traversed
                         if possible_line_len <= 6 and not self.is_valid_line(line) and cells_traversed != 1:
                             lines_killed += 1 # line down killed
                         break
                     row += 1
                     cells_traversed += 1
-
-        board_object.restore_state(board_state)
         return lines_killed
 
 
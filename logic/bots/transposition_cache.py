@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+
+class TranspositionCache:
+    """ Bounded cache of the best combo found for a position, so a position
+        searched before isn't searched again. Evicts the least recently used
+        position when it's full.
+
+        Attributes:
+            max_size(int): Maximum number of positions kept.
+            entries(:obj:`OrderedDict`): (combo, points) by position key, least recently used first.
+            hits(int): Number of lookups that found their position.
+            misses(int): Number of lookups that didn't.
+
+    """
+
+
+    def __init__(self, max_size=4096):
+        """ The constructor can receive the maximum number of positions kept.
+
+            Args:
+                max_size(int): Maximum number of positions kept.
+
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    @staticmethod
+    def get_key(bot, board):
+        """ Returns the key of the position a bot has to play, made of the bot type, search method
+            and evaluator, the board Zobrist hash and the sorted tile ids of the hand, so tile
+            copies share entries. Bots searching or evaluating differently don't share entries.
+
+            Args:
+                bot(:obj:`Bot`): Bot that plays the turn.
+                board(:obj:`Board`): Board object instance with the current game state.
+
+            Returns:
+                tuple: Position key.
+
+        """
+        return type(bot).__name__, bot.search_method, bot.evaluator, board.zobrist_hash, \
+               tuple(sorted(tile.id for tile in bot.hand))
+
+
+    def get(self, key):
+        """ Returns the entry of a position, marking it as recently used.
+
+            Args:
+                key(tuple): Position key.
+
+            Returns:
+                tuple: Best combo and its points, None if the position isn't cached.
+                       The combo is None when nothing could be played.
+
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+
+    def put(self, key, combo, points):
+        """ Saves the best combo of a position, evicting the least recently used
+            position if the cache is full.
+
+            Args:
+                key(tuple): Position key.
+                combo(:obj:`TileCombo`): Best combo, None if nothing could be played.
+                points(int): Combo points.
+
+        """
+        self.entries[key] = (combo, points)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+    def clear(self):
+        """ Removes every entry and resets the counters.
+
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def __str__(self):
+        return "Transposition cache: " + str(len(self)) + " positions, " + \
+               str(self.hits) + " hits, " + str(self.misses) + " misses"
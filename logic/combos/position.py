@@ -8,6 +8,8 @@ class Position:
 
     """
 
+    __slots__ = ('row', 'col')
+
 
     def __init__(self, row, col):
         """ The constructor receives the two attributes.
@@ -6,15 +6,19 @@ class TileCombo:
         Attributes:
             tiles(:obj:`list` of :obj:`Tile`): List of played tiles.
             positions(:obj:`list` of :obj:`Position`): List of played positions.
+            points(int): Points scored by the combo when known, None otherwise.
 
     """
 
+    __slots__ = ('tiles', 'positions', 'points')
+
 
     def __init__(self):
         """ The constructor initiates the attributes as empty.
         """
         self.tiles = []
         self.positions = []
+        self.points = None
 
 
     def add_move(self, tile, position):
@@ -44,6 +48,7 @@ class TileCombo:
         copy = TileCombo()
         copy.tiles.extend(self.tiles)
         copy.positions.extend(self.positions)
+        copy.points = self.points
         return copy
 
 
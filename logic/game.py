@@ -0,0 +1,153 @@
+import time
+
+from logic.game_objects.bag import Bag
+from logic.game_objects.board import Board
+
+
+class Game:
+    """ Qwirkle game between bots, without any display. Plays turns on its board and bag,
+        the GUI, tournaments and benchmarks only drive it and read its state.
+
+        Attributes:
+            bots(:obj:`list` of :obj:`Bot`): Players, in turn order.
+            bag(:obj:`Bag`): Bag of tiles.
+            board(:obj:`Board`): Game board.
+            turns(int): Number of turns played.
+            finished(bool): Indicates if a bot ran out of tiles.
+            last_combo(:obj:`TileCombo`): Combo played in the last turn, None if it was a swap.
+            last_points(int): Points scored in the last turn.
+            last_stats(:obj:`SearchStats`): Search stats of the last turn, None if the bot
+                doesn't collect them.
+            last_finished(bool): Indicates if the search of the last turn finished in time.
+            turn_time(float): Seconds a bot can search in its turn, None for no limit.
+            turn_hooks(:obj:`list` of function): Functions called after each turn.
+
+    """
+
+    finish_bonus = 6  # points for the bot that runs out of tiles first
+
+    def __init__(self, bots, bag=None, board=None, deal=True, turn_time=None):
+        """ The constructor receives the bots and can receive the bag and the board, new ones by
+            default. The bots draw their hands unless deal is False.
+
+            Args:
+                bots(:obj:`list` of :obj:`Bot`): Players, in turn order.
+                bag(:obj:`Bag`): Bag of tiles.
+                board(:obj:`Board`): Game board.
+                deal(bool): Indicates if the bots draw their hands.
+                turn_time(float): Seconds a bot can search in its turn, None for no limit.
+
+        """
+        self.bots = list(bots)
+        self.bag = bag if bag is not None else Bag()
+        self.board = board if board is not None else Board()
+        self.turns = 0
+        self.finished = False
+        self.last_combo = None
+        self.last_points = 0
+        self.last_stats = None
+        self.last_finished = True
+        self.turn_time = turn_time
+        self.turn_hooks = []
+
+        if deal:
+            for bot in self.bots:
+                bot.draw_tiles(self.bag)
+
+
+    def add_turn_hook(self, hook):
+        """ Adds a function called after each turn as hook(game, bot, combo, points),
+            where combo is None if the bot swapped its tiles. The search stats of the
+            turn are in game.last_stats.
+
+            Args:
+                hook(function): Turn hook.
+
+        """
+        self.turn_hooks.append(hook)
+
+
+    def get_current_bot(self):
+        """ Returns the bot that plays the next turn in turn order.
+
+            Returns:
+                :obj:`Bot`: Next bot.
+
+        """
+        return self.bots[self.turns % len(self.bots)]
+
+
+    def step(self, bot=None):
+        """ Plays a turn. The bot plays its best combo, or swaps its tiles if it can't play any.
+            With a turn time the bot plays the best combo it finds in time.
+
+            Args:
+                bot(:obj:`Bot`): Bot that plays the turn, the next one in turn order by default.
+
+            Returns:
+                :obj:`TileCombo`: Played combo, None if the bot swapped its tiles.
+
+        """
+        if bot is None:
+            bot = self.get_current_bot()
+        stats_before = bot.stats.copy() if bot.stats is not None else None
+        deadline = time.perf_counter() + self.turn_time if self.turn_time is not None else None
+        combo, self.last_finished = bot.search_best_combo(self.board, deadline)
+        self.play_turn(bot, combo, stats_before)
+        return combo
+
+
+    def play_turn(self, bot, combo, stats_before=None):
+        """ Plays a combo decided by a bot: scores and plays it, and refills the bot hand.
+            Without a combo the bot swaps its tiles. The game finishes when the bot runs
+            out of tiles, which gives it the finish bonus.
+
+            Args:
+                bot(:obj:`Bot`): Bot that plays the turn.
+                combo(:obj:`TileCombo`): Combo to play, or None to swap the bot tiles.
+                stats_before(:obj:`SearchStats`): Copy of the bot stats before the turn,
+                    to keep the stats of the turn in last_stats.
+
+        """
+        points = 0
+        if combo is not None:
+            # the game scoring isn't part of the bot search, it's kept out of its stats
+            stats, bot.stats = bot.stats, None
+            points = bot.get_combo_points(self.board, combo)
+            bot.stats = stats
+            bot.points += points
+            bot.play_combo(self.board, combo)
+            bot.remove_tiles_from_hand(combo.tiles)
+            bot.draw_tiles(self.bag)
+        else:
+            self.bag.swap_all_tiles(bot)  # bot can't play any combo with current hand
+
+        if bot.out_of_tiles():
+            bot.points += self.finish_bonus
+            self.finished = True
+
+        self.turns += 1
+        self.last_combo = combo
+        self.last_points = points
+        self.last_stats = bot.stats - stats_before if stats_before is not None else None
+        for hook in self.turn_hooks:
+            hook(self, bot, combo, points)
+
+
+    def play_to_end(self, max_turns=None):
+        """ Plays turns in turn order until the game is finished.
+
+            Args:
+                max_turns(int): Turns after which the game is stopped even if unfinished.
+
+            Returns:
+                bool: True if the game finished, false if it was stopped.
+
+        """
+        while not self.finished and (max_turns is None or self.turns < max_turns):
+            self.step()
+        return self.finished
+
+
+    def __str__(self):
+        return "Game turn " + str(self.turns) + ": " + ", ".join(str(bot) for bot in self.bots)
@@ -4,20 +4,37 @@ from logic.tiles.tile import Tile
 import random
 
 class Bag:
-    """ Qwirkle bag of tiles.
+    """ Qwirkle bag of tiles. Tiles are drawn from the end of the list, so the
+        draws of a bag only depend on its random generator.
 
         Attributes:
                 tiles(:obj:`list` of :obj:`Tile`): List of playable tiles.
+                rng(:obj:`random.Random`): Random generator that shuffles the tiles.
 
     """
 
 
-    def __init__(self):
-        """ The constructor initializes the default bag.
+    def __init__(self, rng=None, seed=None, tiles=None):
+        """ The constructor initializes the default bag, or a bag of some tiles. It can receive
+            its random generator, or a seed to create one. The global random generator is
+            used otherwise.
+
+            Args:
+                rng(:obj:`random.Random`): Random generator of the bag.
+                seed(int): Seed of a new random generator, used if rng is None.
+                tiles(:obj:`list` of :obj:`Tile`): Tiles of the bag, shuffled, the default
+                    108 tiles if None.
 
         """
+        if rng is None:
+            rng = random.Random(seed) if seed is not None else random
+        self.rng = rng
         self.tiles = []
-        self.set_default_bag()
+        if tiles is None:
+            self.set_default_bag()
+        else:
+            self.tiles = list(tiles)
+            self.rng.shuffle(self.tiles)
 
 
     def set_default_bag(self):
@@ -30,11 +47,11 @@ class Bag:
         """
         self.tiles = []
         for tile_copy in range(3):
-            for shape in Shape:
-                for color in Color:
-                    tile = Tile(color.value, shape.value)
+            for shape_index in range(len(Shape)):
+                for color_index in range(len(Color)):
+                    tile = Tile.get_tile(color_index * 6 + shape_index, tile_copy)
                     self.tiles.append(tile)
-        random.shuffle(self.tiles)
+        self.rng.shuffle(self.tiles)
 
 
     def draw(self):
@@ -68,11 +85,32 @@ class Bag:
         tiles_to_swapp = len(bot.hand)
         for tile in bot.hand:
             self.tiles.append(tile)
-        random.shuffle(self.tiles)
+        self.rng.shuffle(self.tiles)
         bot.hand = []
         bot.draw_tiles(self)
 
 
+    def get_state(self):
+        """ Returns the bag state, its tiles and the state of its random generator.
+            Tiles are shared instances, so only the list is copied.
+
+        """
+        return tuple(self.tiles), self.rng.getstate()
+
+
+    def restore_state(self, state):
+        """ Restores the state of the bag, the next draws and shuffles repeat the ones
+            made after the state was saved.
+
+            Args:
+                state(tuple): Tiles and random generator state as returned by get_state.
+
+        """
+        tiles, rng_state = state
+        self.tiles = list(tiles)
+        self.rng.setstate(rng_state)
+
+
     def is_empty(self):
         """ Indicates if the tile bag is empty.
 
@@ -1,13 +1,51 @@
+import struct
+
 from logic.combos.position import Position
+from logic.tiles.line import all_tiles_mask, get_line_extensions, get_line_mask
+from logic.tiles.tile import tile_copies
+
+zobrist_mask = (1 << 64) - 1
+
+# header of the board bytes: absolute origin row and column and size of the tiles bounding box
+bytes_header = struct.Struct('<hhHH')
+empty_cell_byte = 0xFF
+
+
+def get_zobrist_key(row, col, tile_id):
+    """ Returns the 64 bits Zobrist key of a tile kind in an absolute board cell. Keys are
+        mixed from the cell and the tile id (splitmix64), so they need no table and are the
+        same in every process.
+
+        Args:
+            row(int): Board row.
+            col(int): Board column.
+            tile_id(int): Tile kind id.
+
+        Returns:
+            int: Zobrist key.
+
+    """
+    key = ((row & 0xffff) << 32 | (col & 0xffff) << 16 | tile_id) + 0x9e3779b97f4a7c15
+    key = ((key ^ (key >> 30)) * 0xbf58476d1ce4e5b9) & zobrist_mask
+    key = ((key ^ (key >> 27)) * 0x94d049bb133111eb) & zobrist_mask
+    return key ^ (key >> 31)
 
 
 class Board:
     """ The game board manages the state of the board and the played
-        positions.
+        positions. Tiles are kept by absolute (row, col) coordinates, which can be
+        negative and never change once a tile is played, so the board needs no padding.
 
         Attributes:
-            board(:obj:`list` of :obj:`Tile`): Two-dimensional list of tiles or zeros.
+            tiles(:obj:`dict`): Played tiles by (row, col) absolute coordinates.
             played_positions(:obj:`list` of :obj:`Position`): List of the positions played.
+            frontier(:obj:`set` of :obj:`tuple`): (row, col) of the empty cells adjacent to a tile.
+            legal_tiles(:obj:`dict`): Mask of the tiles that fit the row and column of frontier cells,
+                computed on demand and dropped when a play changes their lines.
+            journal(:obj:`list` of :obj:`tuple`): (row, col) of the tiles played since the first checkpoint.
+            checkpoints(:obj:`list` of int): Journal lengths saved by push, restored by pop.
+            zobrist_hash(int): 64 bits hash of the tiles by absolute cell, the xor of their
+                Zobrist keys. The board view padding doesn't change it.
 
     """
 
@@ -16,12 +54,22 @@ class Board:
 
             Args:
                 board(:obj:`list` of :obj:`Tile`): Two-dimensional list of tiles or zeros.
+                    Tiles are placed at their row and column of the list.
 
         """
-        self.board = board
+        self.tiles = {}
         self.played_positions = []
+        self.frontier = set()
+        self.legal_tiles = {}
+        self.journal = []
+        self.checkpoints = []
+        self.zobrist_hash = 0
         if board != [[0]]:
             self.played_positions = self.get_played_positions(board)
+            for position in self.played_positions:
+                self.tiles[(position.row, position.col)] = board[position.row][position.col]
+            self.frontier = self.get_frontier()
+            self.zobrist_hash = self.get_zobrist_hash()
 
 
     def get_played_positions(self, board):
@@ -44,137 +92,348 @@ class Board:
 
 
     def play_tile(self, tile, position):
-        """ Determines if a tile move if valid. Checks vertically and horizontally.
+        """ Places a tile on the board.
 
             Args:
                 tile(:obj:'Tile'): Played tile.
                 position(:obj:'Position'): Board row and column to insert the tile.
 
         """
-        self.board[position.row][position.col] = tile
-        self.played_positions.append(Position(position.row, position.col))
-        self.adjust_padding()
+        row, col = position.row, position.col
+        self.tiles[(row, col)] = tile
+        self.played_positions.append(Position(row, col))
+        self.zobrist_hash ^= get_zobrist_key(row, col, tile.id)
+
+        # the cell leaves the frontier and its empty neighbors join it
+        self.frontier.discard((row, col))
+        self.legal_tiles.pop((row, col), None)
+        for cell in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if cell not in self.tiles:
+                self.frontier.add(cell)
+        self.clear_line_ends(row, col)
+
+        # only record the move when it can be undone
+        if self.checkpoints:
+            self.journal.append((row, col))
 
 
-    def adjust_padding(self):
-        """ Inserts padding to the board if needed. Is needed when a tile is in
-            at the most outer layer of the board (first or last column or row).
-            Void spaces are needed always at the outer layer to make be able to
-            make moves.
-            The played positions adjust is called just for top and left padding,
-            since they change the row and columns of the original placed tiles.
+    def remove_tile(self, row, col):
+        """ Removes a tile from the board, keeping the frontier updated.
+
+            Args:
+                row(int): Board row of the tile.
+                col(int): Board column of the tile.
 
         """
-        top = first = 0
+        tile = self.tiles.pop((row, col))
+        self.zobrist_hash ^= get_zobrist_key(row, col, tile.id)
 
-        # check top padding
-        if any(self.board[top]):  # any tile in first row?
-            self.board.insert(0, [0] * len(self.board[0]))
-            self.adjust_played_positions(1, 0)
+        # neighbors only linked to the removed tile leave the frontier
+        for cell in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if cell not in self.tiles and not self.has_adjacent_tile(cell[0], cell[1]):
+                self.frontier.discard(cell)
 
-            # check bottom padding
-        bottom = len(self.board) - 1
-        if any(self.board[bottom]):  # any tile in last row?
-            self.board.append([0] * len(self.board[0]))
+        if self.has_adjacent_tile(row, col):
+            self.frontier.add((row, col))
+        self.clear_line_ends(row, col)
 
-        # check left padding
-        for row in self.board:
-            if row[first]:  # any tile in first column?
-                for i in range(len(self.board)):
-                    self.board[i].insert(0, 0)
-                self.adjust_played_positions(0, 1)
-                break;
-
-        # check right padding
-        last = len(self.board[0]) - 1
-        for row in self.board:
-            if row[last]:  # any tile in last column?
-                for i in range(len(self.board)):
-                    self.board[i].append(0)
-                break;
 
+    def clear_line_ends(self, row, col):
+        """ Drops the legal tiles of the empty cells at the ends of the row and column
+            lines of a cell, the only ones affected when the cell changes.
+
+            Args:
+                row(int): Board row of the changed cell.
+                col(int): Board column of the changed cell.
 
-    def adjust_played_positions(self, row_offset, col_offset):
-        """ Adjust the played positions by an offset, after a padding happens.
+        """
+        for row_step, col_step in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            end_row, end_col = row + row_step, col + col_step
+            while (end_row, end_col) in self.tiles:
+                end_row += row_step
+                end_col += col_step
+            self.legal_tiles.pop((end_row, end_col), None)
+
+
+    def compute_legal_tiles(self, row, col):
+        """ Computes the mask of the tiles that can be played in an empty cell, keeping
+            valid both its row and column lines.
 
             Args:
-                row_offset(int): row offset applied to get the updated position in the board.
-                col_offset(int): col offset applied to get the updated position in the board.
+                row(int): Board row of the cell.
+                col(int): Board column of the cell.
+
+            Returns:
+                int: Tile mask of the legal tiles.
 
         """
-        for played_pos in self.played_positions:
-            played_pos.row += row_offset
-            played_pos.col += col_offset
+        horizontal_line = get_line_mask(self.get_linked_tiles(row, col, 0, -1) + self.get_linked_tiles(row, col, 0, 1))
+        vertical_line = get_line_mask(self.get_linked_tiles(row, col, -1, 0) + self.get_linked_tiles(row, col, 1, 0))
+        return get_line_extensions(horizontal_line) & get_line_extensions(vertical_line)
 
 
-    def get_state(self):
-        """ Returns the board state as a shallow copy of its tile matrix.
+    def get_linked_tiles(self, row, col, row_step, col_step):
+        """ Returns the tiles linked to a cell in a direction, excluding the cell.
+
+            Args:
+                row(int): Board row of the cell.
+                col(int): Board column of the cell.
+                row_step(int): Row increment of the direction.
+                col_step(int): Column increment of the direction.
+
+            Returns:
+                :obj:`list` of :obj:`Tile`: Linked tiles, nearest first.
 
         """
-        # create null matrix of self.board dimensions
-        copy = [ [ 0 for col in range(len(self.board[0])) ] for row in range(len(self.board)) ]
-        # copy played tiles
-        for pos in self.played_positions:
-            copy[pos.row][pos.col] = self.board[pos.row][pos.col]
-        return copy
+        linked_tiles = []
+        row += row_step
+        col += col_step
+        while (row, col) in self.tiles:
+            linked_tiles.append(self.tiles[(row, col)])
+            row += row_step
+            col += col_step
+        return linked_tiles
 
 
-    def restore_state(self, state):
-        """ Restores the state of the board. Sets board and played_positions.
+    def get_legal_tiles(self, row, col):
+        """ Returns the mask of the tiles that fit the row and column lines of an empty cell.
+            Cells away from the frontier have no restrictions.
 
             Args:
-                state(:obj:`list` of :obj:`Tile`): State as two-dimensional list of tiles or zeros.
+                row(int): Board row of the cell.
+                col(int): Board column of the cell.
+
+            Returns:
+                int: Tile mask, bit tile id is set when the tile is legal.
 
         """
-        self.board = state
-        self.played_positions = self.get_played_positions(state)
+        legal_tiles = self.legal_tiles.get((row, col))
+        if legal_tiles is None:
+            if (row, col) not in self.frontier:
+                return all_tiles_mask
+            legal_tiles = self.legal_tiles[(row, col)] = self.compute_legal_tiles(row, col)
+        return legal_tiles
 
 
-    def get_last_played_positions(self, number):
-        return self.played_positions[(len(self.played_positions) - number):]
+    def has_adjacent_tile(self, row, col):
+        """ Indicates if a cell has a tile up, down, left or right.
 
+            Args:
+                row(int): Board row of the cell.
+                col(int): Board column of the cell.
+
+            Returns:
+                bool: True if there is an adjacent tile, false otherwise.
+
+        """
+        tiles = self.tiles
+        return (row - 1, col) in tiles or (row + 1, col) in tiles or \
+               (row, col - 1) in tiles or (row, col + 1) in tiles
 
-    def is_empty(self):
-        """ Indicates if the board has any tile.
+
+    def get_frontier(self):
+        """ Returns the empty cells adjacent to at least one tile, scanning all the tiles.
+            The frontier attribute keeps them updated without scanning.
 
             Returns:
-                bool: True if the aren't any played positions, false otherwise.
+                :obj:`set` of :obj:`tuple`: (row, col) of the frontier cells.
 
         """
-        return len(self.played_positions) == 0
+        frontier = set()
+        for row, col in self.tiles:
+            for cell in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+                if cell not in self.tiles:
+                    frontier.add(cell)
+        return frontier
 
 
-    def get_current_tiles_positions(self, tiles):
-        """ Returns a list of position of a list of tiles on the board.
+    def get_zobrist_hash(self):
+        """ Returns the Zobrist hash of the tiles, scanning all of them. The zobrist_hash
+            attribute keeps it updated without scanning.
+
+            Returns:
+                int: 64 bits board hash.
+
+        """
+        zobrist_hash = 0
+        for (row, col), tile in self.tiles.items():
+            zobrist_hash ^= get_zobrist_key(row, col, tile.id)
+        return zobrist_hash
+
+
+    def get_tile(self, row, col):
+        """ Returns the content of a board cell.
 
             Args:
-                tiles(:obj:`list` of :obj:`Tile`): Tiles to search.
+                row(int): Board row.
+                col(int): Board column.
 
             Returns:
-                :obj:`list` of :obj:`Positions`: Current tiles positions on the board.
+                :obj:`Tile`: Tile in the cell, or 0 if empty.
+
+        """
+        return self.tiles.get((row, col), 0)
+
+
+    def push(self):
+        """ Saves a checkpoint of the board. Moves played after it are undone by pop.
+            Checkpoints can be nested.
+
+        """
+        self.checkpoints.append(len(self.journal))
+
+
+    def pop(self):
+        """ Restores the board to the last checkpoint, undoing the moves played after it.
+            Costs the number of undone moves, not the board size.
 
         """
-        positions = []
-        for tile in tiles:
-            tile_pos = self.get_tile_position(tile)
-            positions.append(tile_pos)
-        return positions
+        checkpoint = self.checkpoints.pop()
+        while len(self.journal) > checkpoint:
+            row, col = self.journal.pop()
+            self.remove_tile(row, col)
+            self.played_positions.pop()
 
 
-    def get_tile_position(self, tile):
-        """ Returns the position of a tile on the board.
+    def get_bounds(self):
+        """ Returns the bounding box of the played tiles.
+
+            Returns:
+                tuple: Minimum row, maximum row, minimum column and maximum column,
+                       or None if the board is empty.
+
+        """
+        if self.is_empty():
+            return None
+        rows = [row for row, col in self.tiles]
+        cols = [col for row, col in self.tiles]
+        return min(rows), max(rows), min(cols), max(cols)
+
+
+    @property
+    def board(self):
+        """ Two-dimensional list view of the board, with a void row and column around
+            the played tiles. Its (0, 0) cell is at the absolute view origin.
+
+        """
+        if self.is_empty():
+            return [[0]]
+
+        min_row, max_row, min_col, max_col = self.get_bounds()
+        view = [[0] * (max_col - min_col + 3) for row in range(max_row - min_row + 3)]
+        for (row, col), tile in self.tiles.items():
+            view[row - min_row + 1][col - min_col + 1] = tile
+        return view
+
+
+    def get_view_origin(self):
+        """ Returns the absolute coordinates of the first cell of the board view.
+
+            Returns:
+                tuple: (row, col) of the view origin.
+
+        """
+        if self.is_empty():
+            return 0, 0
+        min_row, max_row, min_col, max_col = self.get_bounds()
+        return min_row - 1, min_col - 1
+
+
+    def get_view_position(self, position):
+        """ Translates an absolute board position to the board view.
 
             Args:
-                tile(:obj:`Tile`): Tile to search.
+                position(:obj:`Position`): Absolute board position.
 
             Returns:
-                :obj:`Position`: Tile board position.
+                :obj:`Position`: Row and column in the board view.
+
+        """
+        origin_row, origin_col = self.get_view_origin()
+        return Position(position.row - origin_row, position.col - origin_col)
+
+
+    def get_state(self):
+        """ Returns the board state as a shallow copy of its tiles.
+            Prefer push and pop to backtrack moves, they don't copy the board.
 
         """
-        for position in self.played_positions:
-            if self.board[position.row][position.col] is tile:
-                return position
-        return None
+        return dict(self.tiles)
+
+
+    def restore_state(self, state):
+        """ Restores the state of the board. Sets tiles and played_positions.
+
+            Args:
+                state(:obj:`dict`): Tiles by (row, col) as returned by get_state.
+
+        """
+        self.tiles = dict(state)
+        self.played_positions = [Position(row, col) for row, col in sorted(state)]
+        self.frontier = self.get_frontier()
+        self.legal_tiles = {}
+        self.zobrist_hash = self.get_zobrist_hash()
+
+
+    def to_bytes(self):
+        """ Returns a compact encoding of the board: a header with the absolute origin and size
+            of the bounding box of the tiles, followed by a byte per box cell with its tile id,
+            0xFF if empty. Boards with the same tiles have the same bytes, so they can be used
+            as dict keys, and they can be sent to other processes or shared memory as they are.
+
+            Returns:
+                bytes: Board encoding.
+
+        """
+        bounds = self.get_bounds()
+        if bounds is None:
+            return bytes_header.pack(0, 0, 0, 0)
+        min_row, max_row, min_col, max_col = bounds
+        rows, cols = max_row - min_row + 1, max_col - min_col + 1
+        cells = bytearray([empty_cell_byte]) * (rows * cols)
+        for (row, col), tile in self.tiles.items():
+            cells[(row - min_row) * cols + col - min_col] = tile.id
+        return bytes_header.pack(min_row, min_col, rows, cols) + cells
+
+
+    @classmethod
+    def from_bytes(cls, data):
+        """ Creates a board from the encoding returned by to_bytes. Tiles are the shared
+            instances, repeated kinds get the next copies in order.
+
+            Args:
+                data(bytes): Board encoding, any bytes-like object, like a shared memory buffer,
+                    it isn't copied.
+
+            Returns:
+                :obj:`Board`: Board with the encoded tiles.
+
+        """
+        origin_row, origin_col, rows, cols = bytes_header.unpack_from(data)
+        cells = memoryview(data).cast('B')[bytes_header.size:bytes_header.size + rows * cols]
+        tiles = {}
+        copies = [0] * 36
+        for index, tile_id in enumerate(cells):
+            if tile_id != empty_cell_byte:
+                tiles[(origin_row + index // cols, origin_col + index % cols)] = tile_copies[min(copies[tile_id], 2)][tile_id]
+                copies[tile_id] += 1
+        board = cls()
+        board.restore_state(tiles)
+        return board
+
+
+    def get_last_played_positions(self, number):
+        return self.played_positions[(len(self.played_positions) - number):]
+
+
+    def is_empty(self):
+        """ Indicates if the board has any tile.
+
+            Returns:
+                bool: True if the aren't any played positions, false otherwise.
+
+        """
+        return len(self.played_positions) == 0
 
 
     def __str__(self):
@@ -190,4 +449,7 @@ class Board:
 
 
     def __len__(self):
-        return len(self.board)
+        if self.is_empty():
+            return 1
+        min_row, max_row, min_col, max_col = self.get_bounds()
+        return max_row - min_row + 3
@@ -0,0 +1,277 @@
+from logic.tiles.line import line_extensions, line_points
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only the batch evaluation needs it
+    np = None
+
+# directions of the lines a tile belongs to, as (row step, col step)
+horizontal = (0, 1)
+vertical = (1, 0)
+
+# combo tiles are tagged in the planes with their play order, id + order_tag * (move + 1)
+order_tag = 64
+id_mask = order_tag - 1
+
+
+class NumpyBoard:
+    """ Board as a NumPy plane of tile ids, used to evaluate many candidate combos at once.
+        The plane covers the played tiles with a margin of empty cells wide enough for any
+        combo and the lines around it, each combo is played on its own copy of the plane.
+        Combos are evaluated in chunks, so only a chunk of plane copies is held at once.
+
+        Attributes:
+            tile_ids(:obj:`numpy.ndarray`): int8 plane of tile ids, -1 for empty cells.
+            origin_row(int): Absolute row of the first plane row.
+            origin_col(int): Absolute column of the first plane column.
+
+    """
+
+    margin = 16  # a combo is 6 cells away from the tiles at most, its lines 6 more
+    chunk_size = 256  # combos evaluated at once, each one has its own plane copy
+
+    def __init__(self, board):
+        """ The constructor copies the tiles of a board.
+
+            Args:
+                board(:obj:`Board`): Board object instance with the current game state.
+
+            Raises:
+                ImportError: If numpy isn't installed.
+
+        """
+        if np is None:
+            raise ImportError("NumpyBoard requires numpy")
+
+        min_row, max_row, min_col, max_col = board.get_bounds() if not board.is_empty() else (0, 0, 0, 0)
+        self.origin_row = min_row - self.margin
+        self.origin_col = min_col - self.margin
+        self.tile_ids = np.full((max_row - min_row + 1 + 2 * self.margin, max_col - min_col + 1 + 2 * self.margin),
+                                -1, dtype=np.int8)
+        for (row, col), tile in board.tiles.items():
+            self.tile_ids[row - self.origin_row, col - self.origin_col] = tile.id
+
+
+    def get_combo_arrays(self, combos):
+        """ Returns the index arrays of a list of combos, one row per combo with its moves in
+            play order. Combos shorter than the longest are padded with empty moves in the
+            first plane cell, which is always empty.
+
+            Args:
+                combos(:obj:`list` of :obj:`TileCombo`): Candidate combos.
+
+            Returns:
+                tuple: Plane rows, plane columns and tile ids (-1 for padding) as N x L arrays.
+
+        """
+        combo_length = max((len(combo) for combo in combos), default=0)
+        rows, cols, ids = [], [], []
+        for combo in combos:
+            padding = [0] * (combo_length - len(combo))
+            rows.extend([position.row - self.origin_row for position in combo.positions] + padding)
+            cols.extend([position.col - self.origin_col for position in combo.positions] + padding)
+            ids.extend([tile.id for tile in combo.tiles] + [-1] * len(padding))
+        shape = (len(combos), combo_length)
+        return np.array(rows, dtype=np.intp).reshape(shape), np.array(cols, dtype=np.intp).reshape(shape), \
+               np.array(ids, dtype=np.int8).reshape(shape)
+
+
+    def get_combos_points(self, combos):
+        """ Returns the points of a list of combos, see evaluate.
+
+            Args:
+                combos(:obj:`list` of :obj:`TileCombo`): Candidate combos.
+
+            Returns:
+                :obj:`numpy.ndarray`: Points of each combo.
+
+        """
+        return self.evaluate_chunks(combos, with_features=False)[1]
+
+
+    def get_combos_features(self, combos):
+        """ Returns the qwirkle chances caused, points and possible lines killed of a list
+            of combos, see evaluate.
+
+            Args:
+                combos(:obj:`list` of :obj:`TileCombo`): Candidate combos.
+
+            Returns:
+                tuple: Qwirkle chances caused, points and possible lines killed vectors.
+
+        """
+        return self.evaluate_chunks(combos)
+
+
+    def evaluate_chunks(self, combos, with_features=True):
+        """ Evaluates a list of combos in chunks of chunk_size combos, see evaluate.
+
+            Args:
+                combos(:obj:`list` of :obj:`TileCombo`): Candidate combos.
+                with_features(bool): Evaluate the qwirkle chances and lines killed,
+                                     otherwise they are None.
+
+            Returns:
+                tuple: Qwirkle chances caused, points and possible lines killed vectors.
+
+        """
+        chunks = [self.evaluate(*self.get_combo_arrays(combos[start:start + self.chunk_size]), with_features)
+                  for start in range(0, len(combos), self.chunk_size)]
+        if not chunks:
+            empty = np.zeros(0, dtype=np.int64)
+            return (empty, empty, empty) if with_features else (None, empty, None)
+        return tuple(np.concatenate(vectors) if vectors[0] is not None else None for vectors in zip(*chunks))
+
+
+    def evaluate(self, rows, cols, ids, with_features=True):
+        """ Evaluates N combos at once, given as index arrays. Each combo is played on its
+            own copy of the plane following the same rules of Bot.get_combo_points,
+            SmarterBot.play_counting_chances and SmarterBot.get_played_lines_killed.
+
+            Args:
+                rows(:obj:`numpy.ndarray`): N x L plane rows of the moves in play order.
+                cols(:obj:`numpy.ndarray`): N x L plane columns of the moves.
+                ids(:obj:`numpy.ndarray`): N x L tile ids of the moves, -1 for padding.
+                with_features(bool): Evaluate the qwirkle chances and lines killed,
+                                     otherwise they are None.
+
+            Returns:
+                tuple: Qwirkle chances caused, points and possible lines killed vectors.
+
+        """
+        combo_count, combo_length = ids.shape
+        played = ids >= 0
+
+        # moves are tagged with their play order, cells below the tag of a move were
+        # already played when the move was played
+        move_tags = (np.arange(combo_length, dtype=np.int16) + 1) * order_tag
+        planes = np.repeat(self.tile_ids.astype(np.int16)[np.newaxis], combo_count, axis=0)
+        planes[np.arange(combo_count)[:, np.newaxis], rows, cols] = np.where(played, ids + move_tags, -1)
+
+        # every move of every combo is a lane, evaluated at once
+        lanes = (planes, np.repeat(np.arange(combo_count), combo_length), rows.ravel(), cols.ravel())
+
+        # lines are scored once, by the first move found in them
+        points = np.zeros(combo_count, dtype=np.int64)
+        earlier_moves = np.tri(combo_length, k=-1, dtype=bool)
+        for row_step, col_step in (horizontal, vertical):
+            before = self.get_linked(*lanes, -row_step, -col_step)[0].reshape(played.shape)
+            after = self.get_linked(*lanes, row_step, col_step)[0].reshape(played.shape)
+            line_starts = (rows - before * row_step) * self.tile_ids.shape[1] + (cols - before * col_step)
+            scored = played & (before + after > 0)
+            seen = ((line_starts[:, :, np.newaxis] == line_starts[:, np.newaxis, :]) & scored[:, np.newaxis, :]
+                    & earlier_moves).any(axis=2)
+            points += np.where(scored & ~seen, points_by_length[1 + before + after], 0).sum(axis=1)
+
+        if not with_features:
+            return None, points, None
+
+        # chances depend on the lines each move finds when it's played
+        played_before = np.tile(move_tags, combo_count)
+        line_lengths = [(1 + self.get_linked(*lanes, -row_step, -col_step, played_before=played_before)[0] +
+                         self.get_linked(*lanes, row_step, col_step, played_before=played_before)[0]).reshape(played.shape)
+                        for row_step, col_step in (horizontal, vertical)]
+        chances = np.zeros(combo_count, dtype=np.int64)
+        for move in range(combo_length):
+            for line_length in line_lengths:
+                # the chance left by the 5th tile is not for a rival when the player completes the qwirkle
+                chances -= played[:, move] & (line_length[:, move] == 6) & (chances > 0)
+            for line_length in line_lengths:
+                chances += played[:, move] & (line_length[:, move] == 5)
+
+        # each lane is searched left, right, up and down
+        directions = np.array([(0, -1), (0, 1), (-1, 0), (1, 0)])
+        direction_lanes = [np.repeat(lane, len(directions)) for lane in lanes[1:]]
+        lines_killed = self.get_lines_killed(planes, *direction_lanes, np.repeat(ids.ravel(), len(directions)),
+                                             np.tile(directions[:, 0], ids.size), np.tile(directions[:, 1], ids.size))
+        kills = (lines_killed & np.repeat(played.ravel(), len(directions))).reshape(combo_count, -1).sum(axis=1)
+        return chances, points, kills
+
+
+    def get_lines_killed(self, planes, combo_indexes, rows, cols, ids, row_steps, col_steps):
+        """ Indicates for each lane if the line that could link its played tile with the next
+            tile in its direction, separated by empty cells, is killed by the played tile.
+
+            Args:
+                planes(:obj:`numpy.ndarray`): N planes with the combos played.
+                combo_indexes(:obj:`numpy.ndarray`): Combo plane of each lane.
+                rows(:obj:`numpy.ndarray`): Plane row of the played tile of each lane.
+                cols(:obj:`numpy.ndarray`): Plane column of the played tile of each lane.
+                ids(:obj:`numpy.ndarray`): Id of the played tile of each lane.
+                row_steps(:obj:`numpy.ndarray`): Row increment of the direction of each lane.
+                col_steps(:obj:`numpy.ndarray`): Column increment of the direction of each lane.
+
+            Returns:
+                :obj:`numpy.ndarray`: True for the lanes where the line is killed.
+
+        """
+        # the nearest tile after the empty adjacent cell, at most 4 cells away from it
+        searching = planes[combo_indexes, rows + row_steps, cols + col_steps] < 0
+        found_rows = rows.copy()
+        found_cols = cols.copy()
+        cells_traversed = np.zeros_like(rows)
+        for traversed in range(1, 5):
+            cell_rows, cell_cols = rows + (traversed + 1) * row_steps, cols + (traversed + 1) * col_steps
+            found = searching & (planes[combo_indexes, cell_rows, cell_cols] >= 0)
+            found_rows[found] = cell_rows[found]
+            found_cols[found] = cell_cols[found]
+            cells_traversed[found] = traversed
+            searching &= ~found
+
+        # possible line made by the tiles linked to the played tile and the ones linked to the found tile
+        tile_bits = np.left_shift(np.int64(1), np.maximum(ids, 0).astype(np.int64))
+        found_ids = planes[combo_indexes, found_rows, found_cols] & id_mask
+        found_bits = np.left_shift(np.int64(1), found_ids.astype(np.int64))
+        masks, duplicates = tile_bits | found_bits, tile_bits == found_bits
+        linked_length, masks, duplicates = self.get_linked(planes, combo_indexes, rows, cols, -row_steps, -col_steps,
+                                                           masks, duplicates)
+        found_linked_length, masks, duplicates = self.get_linked(planes, combo_indexes, found_rows, found_cols,
+                                                                 row_steps, col_steps, masks, duplicates)
+        line_length = 2 + linked_length + found_linked_length
+        valid_lines = ~duplicates & np.isin(masks, valid_line_masks)
+        return (cells_traversed > 1) & (line_length + cells_traversed <= 6) & ~valid_lines
+
+
+    def get_linked(self, planes, combo_indexes, rows, cols, row_step, col_step, masks=None, duplicates=None,
+                   played_before=None):
+        """ Counts the tiles linked to the cell of each lane in a direction, excluding the
+            cell. Can also add the linked tiles to line masks, flagging repeated tiles.
+
+            Args:
+                planes(:obj:`numpy.ndarray`): N planes of tagged tile ids.
+                combo_indexes(:obj:`numpy.ndarray`): Combo plane of each lane.
+                rows(:obj:`numpy.ndarray`): Plane row of the cell of each lane.
+                cols(:obj:`numpy.ndarray`): Plane column of the cell of each lane.
+                row_step(int): Row increment of the direction, or an array of them by lane.
+                col_step(int): Column increment of the direction, or an array of them by lane.
+                masks(:obj:`numpy.ndarray`): Line masks the linked tiles are added to, or None.
+                duplicates(:obj:`numpy.ndarray`): Repeated tile flags of the line masks.
+                played_before(:obj:`numpy.ndarray`): Move tag of each lane, only the tiles played
+                    before the move are linked. All of them are linked if None.
+
+            Returns:
+                tuple: Linked tiles count, line masks and repeated tile flags.
+
+        """
+        lengths = np.zeros(len(combo_indexes), dtype=np.intp)
+        linked = np.ones(len(combo_indexes), dtype=bool)
+        for step in range(1, 7):  # lines have 6 tiles at most
+            cells = planes[combo_indexes, rows + step * row_step, cols + step * col_step]
+            linked &= cells >= 0
+            if played_before is not None:
+                linked &= cells < played_before
+            if not linked.any():
+                break
+            lengths += linked
+            if masks is not None:
+                bits = np.where(linked, np.left_shift(np.int64(1), (cells & id_mask).astype(np.int64)), 0)
+                duplicates = duplicates | (masks & bits != 0)
+                masks = masks | bits
+        return lengths, masks, duplicates
+
+
+if np is not None:
+    # masks of every valid line, sorted for lookups
+    valid_line_masks = np.array(sorted(line_extensions), dtype=np.int64)
+    # points by line length, lines are never longer than the plane margin
+    points_by_length = np.array(line_points + [0] * (2 * NumpyBoard.margin), dtype=np.int64)
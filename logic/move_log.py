@@ -0,0 +1,229 @@
+import gzip
+import json
+
+from logic.game_objects.board import Board
+from logic.tiles.tile import Tile
+
+
+class GameRecord:
+    """ Compact record of a game: its seed, the initial order of its bag and the moves of each
+        turn as tile ids and absolute board coordinates. Bot decisions aren't needed to replay it.
+
+        Attributes:
+            seed(int): Seed of the game bag, None if it wasn't seeded.
+            bag(:obj:`list` of int): Tile ids of the bag before the deal, drawn from the end.
+            bots(:obj:`list` of str): Bot class names, in turn order.
+            turns(:obj:`list` of :obj:`list`): Moves of each turn as a flat list of tile id, row
+                and column triples, None for a swap.
+            points(:obj:`list` of int): Points scored in each turn.
+            finished(bool): Indicates if a bot ran out of tiles.
+
+    """
+
+
+    def __init__(self, seed=None, bag=None, bots=None):
+        """ The constructor receives the game seed, the bag before the deal and the bots.
+
+            Args:
+                seed(int): Seed of the game bag.
+                bag(:obj:`Bag`): Bag before the deal.
+                bots(:obj:`list` of :obj:`Bot`): Bots, in turn order.
+
+        """
+        self.seed = seed
+        self.bag = [tile.id for tile in bag.tiles] if bag is not None else []
+        self.bots = [type(bot).__name__ for bot in bots] if bots is not None else []
+        self.turns = []
+        self.points = []
+        self.finished = False
+
+
+    def record(self, game):
+        """ Records the turns of a game as they are played, with a game turn hook.
+
+            Args:
+                game(:obj:`Game`): Game to record, before its first turn.
+
+        """
+        game.add_turn_hook(self.add_turn)
+
+
+    def add_turn(self, game, bot, combo, points):
+        """ Adds a turn to the record, it's the turn hook of the recorded game.
+
+            Args:
+                game(:obj:`Game`): Recorded game.
+                bot(:obj:`Bot`): Bot that played the turn.
+                combo(:obj:`TileCombo`): Played combo, None if the bot swapped its tiles.
+                points(int): Points scored in the turn.
+
+        """
+        if combo is None:
+            self.turns.append(None)
+        else:
+            moves = []
+            for tile, position in zip(combo.tiles, combo.positions):
+                moves.extend((tile.id, position.row, position.col))
+            self.turns.append(moves)
+        self.points.append(points)
+        self.finished = game.finished
+
+
+    def get_tiles(self, turn=None):
+        """ Returns the board tiles after a number of turns.
+
+            Args:
+                turn(int): Number of turns played, all of them if None.
+
+            Returns:
+                :obj:`dict`: Tiles by absolute (row, col), a different copy for each repeated kind.
+
+        """
+        tiles = {}
+        copies = [0] * 36
+        for moves in self.turns[:turn]:
+            if moves is None:
+                continue
+            for move in range(0, len(moves), 3):
+                tile_id, row, col = moves[move:move + 3]
+                tiles[(row, col)] = Tile.get_tile(tile_id, min(copies[tile_id], 2))
+                copies[tile_id] += 1
+        return tiles
+
+
+    def get_board(self, turn=None):
+        """ Rebuilds the board after a number of turns, without replaying the bots.
+
+            Args:
+                turn(int): Number of turns played, all of them if None.
+
+            Returns:
+                :obj:`Board`: Board of the turn.
+
+        """
+        board = Board()
+        board.restore_state(self.get_tiles(turn))
+        return board
+
+
+    def get_points(self, turn=None):
+        """ Returns the points of each bot after a number of turns, without the finish bonus.
+
+            Args:
+                turn(int): Number of turns played, all of them if None.
+
+            Returns:
+                :obj:`list` of int: Points of each bot, in turn order.
+
+        """
+        points = [0] * len(self.bots)
+        for turn_number, turn_points in enumerate(self.points[:turn]):
+            points[turn_number % len(self.bots)] += turn_points
+        return points
+
+
+    def to_dict(self):
+        """ Returns the record as plain values.
+
+        """
+        return {'seed': self.seed, 'bag': self.bag, 'bots': self.bots, 'turns': self.turns,
+                'points': self.points, 'finished': self.finished}
+
+
+    @classmethod
+    def from_dict(cls, record_dict):
+        """ Creates a record from the plain values returned by to_dict.
+
+            Args:
+                record_dict(:obj:`dict`): Record values.
+
+            Returns:
+                :obj:`GameRecord`: Record with the values.
+
+        """
+        record = cls(record_dict.get('seed'))
+        record.bag = record_dict['bag']
+        record.bots = record_dict['bots']
+        record.turns = record_dict['turns']
+        record.points = record_dict['points']
+        record.finished = record_dict.get('finished', False)
+        return record
+
+
+    def __len__(self):
+        return len(self.turns)
+
+
+def open_log(path, mode):
+    """ Opens a move log as text, gzip compressed if the path ends with .gz.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class MoveLogWriter:
+    """ Append-only move log, one JSON game record per line. Records are flushed as they are
+        written, so a log can be read while games are still being played. Logs ending with
+        .gz are gzip compressed, each open adds a gzip member.
+
+        Attributes:
+            path(str): Move log path.
+            games(int): Records written.
+
+    """
+
+
+    def __init__(self, path):
+        """ The constructor opens the log for appending.
+
+            Args:
+                path(str): Move log path.
+
+        """
+        self.path = path
+        self.games = 0
+        self.log_file = open_log(path, 'a')
+
+
+    def write(self, record):
+        """ Appends a game record to the log.
+
+            Args:
+                record(:obj:`GameRecord`): Game record, or its plain values.
+
+        """
+        record_dict = record.to_dict() if isinstance(record, GameRecord) else record
+        self.log_file.write(json.dumps(record_dict, separators=(',', ':')) + '\n')
+        self.log_file.flush()
+        self.games += 1
+
+
+    def close(self):
+        """ Closes the log.
+        """
+        self.log_file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_move_log(path):
+    """ Reads the game records of a move log, skipping a last line still being written.
+
+        Args:
+            path(str): Move log path.
+
+        Yields:
+            :obj:`GameRecord`: Game records, in the order they were written.
+
+    """
+    with open_log(path, 'r') as log_file:
+        for line in log_file:
+            if line.endswith('\n'):
+                yield GameRecord.from_dict(json.loads(line))
@@ -0,0 +1,101 @@
+# a tile mask has the bit tile id set for each tile kind, a line of tiles is the mask of its kinds
+all_tiles_mask = (1 << 36) - 1
+
+# tiles of a line share one of the 6 colors or one of the 6 shapes
+line_group_masks = [0b111111 << (color * 6) for color in range(6)] + \
+                   [sum(1 << (color * 6 + shape) for color in range(6)) for shape in range(6)]
+
+# points of a line by its length, a qwirkle (6 tiles) is doubled
+line_points = [0, 1, 2, 3, 4, 5, 12]
+
+
+def build_line_extensions():
+    """ Builds the table of every valid line mask, each one a subset of an attribute group,
+        to the mask of the tiles that can be added to the line keeping it valid.
+
+        Returns:
+            :obj:`dict`: Tile mask extensions by valid line mask.
+
+    """
+    extensions = {}
+    for group_mask in line_group_masks:
+        group_bits = [bit for bit in range(36) if group_mask >> bit & 1]
+        for subset in range(1 << len(group_bits)):
+            line_mask = sum(1 << group_bits[i] for i in range(len(group_bits)) if subset >> i & 1)
+            extensions[line_mask] = extensions.get(line_mask, 0) | (group_mask & ~line_mask)
+    return extensions
+
+
+line_extensions = build_line_extensions()
+
+
+def get_line_mask(line):
+    """ Returns the tile mask of a line of tiles.
+
+        Args:
+            line(:obj:`list` of :obj:`Tile`): Tiles of the line, in any order.
+
+        Returns:
+            int: Line mask, or None if a tile kind is repeated.
+
+    """
+    line_mask = 0
+    for tile in line:
+        tile_bit = 1 << tile.id
+        if line_mask & tile_bit:  # duplicate tile
+            return None
+        line_mask |= tile_bit
+    return line_mask
+
+
+def is_valid_line_mask(line_mask):
+    """ Indicates if a line mask is valid, all its tiles share color or shape.
+
+        Args:
+            line_mask(int): Line mask.
+
+        Returns:
+            bool: True if the line is valid, false otherwise.
+
+    """
+    return line_mask in line_extensions
+
+
+def get_line_extensions(line_mask):
+    """ Returns the mask of the tiles that can be added to a line keeping it valid.
+
+        Args:
+            line_mask(int): Line mask.
+
+        Returns:
+            int: Tile mask, all the tiles for an empty line and none for an invalid one.
+
+    """
+    return line_extensions.get(line_mask, 0)
+
+
+def get_line_length(line_mask):
+    """ Returns the number of tiles of a line mask.
+
+        Args:
+            line_mask(int): Line mask.
+
+        Returns:
+            int: Line length.
+
+    """
+    return bin(line_mask).count('1')
+
+
+def get_line_points(line_mask):
+    """ Returns the points a line scores when it's completed. Lines of 1 tile
+        score 1, the caller decides if they are counted.
+
+        Args:
+            line_mask(int): Valid line mask.
+
+        Returns:
+            int: Line points.
+
+    """
+    return line_points[get_line_length(line_mask)]
@@ -1,26 +1,65 @@
 from logic.tiles.shape import Shape
 from logic.tiles.color import Color
 
+# index of each color and shape, a tile kind id is color index * 6 + shape index
+colors = [color.value for color in Color]
+shapes = [shape.value for shape in Shape]
+color_indexes = {color: index for index, color in enumerate(colors)}
+shape_indexes = {shape: index for index, shape in enumerate(shapes)}
+
 class Tile:
-    """ Qwirkle tile piece, with shape and color.
+    """ Qwirkle tile piece, with shape and color. Tiles are compact: they only keep
+        the kind id and the copy index, color and shape strings are derived for display.
+        Tiles are compared by identity, tiles of the same kind have the same id.
 
         Attributes:
-            color(str): Tile color.
-            shape(str): Tile shape.
+            id(int): Tile kind id, color index * 6 + shape index, from 0 to 35.
+            copy(int): Copy index among the tiles of the same kind.
 
     """
 
+    __slots__ = ('id', 'copy')
+
 
-    def __init__(self, color, shape):
-        """ The constructor receives all the attributes.
+    def __init__(self, color, shape, copy=0):
+        """ The constructor receives the color and shape, and optionally the copy index.
 
             Args:
                 color(str): Tile color.
                 shape(str): Tile shape.
+                copy(int): Copy index among the tiles of the same kind.
 
         """
-        self.color = color
-        self.shape = shape
+        self.id = color_indexes[color] * 6 + shape_indexes[shape]
+        self.copy = copy
+
+
+    @property
+    def color(self):
+        """ str: Tile color. """
+        return colors[self.id // 6]
+
+
+    @property
+    def shape(self):
+        """ str: Tile shape. """
+        return shapes[self.id % 6]
+
+
+    @staticmethod
+    def get_tile(tile_id, copy=0):
+        """ Returns the shared tile instance of a kind and copy. A game uses these
+            108 instances instead of creating its own.
+
+            Args:
+                tile_id(int): Tile kind id.
+                copy(int): Copy index, from 0 to 2.
+
+            Returns:
+                :obj:`Tile`: Shared tile.
+
+        """
+        return tile_copies[copy][tile_id]
 
 
     def __str__(self):
@@ -30,6 +69,55 @@ class Tile:
     def __repr__(self):
         return self.__str__()
 
+
+# shared instances of the 3 copies of the 36 tile kinds, the first copy are the kind prototypes
+tile_copies = [[Tile(colors[tile_id // 6], shapes[tile_id % 6], copy) for tile_id in range(36)] for copy in range(3)]
+tile_prototypes = tile_copies[0]
+
+
+def get_tiles_by_id(tile_ids):
+    """ Returns the shared tiles of some kinds, repeated kinds get the next copies in order.
+
+        Args:
+            tile_ids(:obj:`list` of int): Tile kind ids, an iterable of ints like bytes works too.
+
+        Returns:
+            :obj:`list` of :obj:`Tile`: Shared tiles.
+
+    """
+    copies = [0] * 36
+    tiles = []
+    for tile_id in tile_ids:
+        tiles.append(tile_copies[min(copies[tile_id], 2)][tile_id])
+        copies[tile_id] += 1
+    return tiles
+
+
+def tiles_to_bytes(tiles):
+    """ Returns a compact encoding of a list of tiles, like a hand, a byte with the id of each tile.
+
+        Args:
+            tiles(:obj:`list` of :obj:`Tile`): Tiles.
+
+        Returns:
+            bytes: Tile ids.
+
+    """
+    return bytes(tile.id for tile in tiles)
+
+
+def tiles_from_bytes(data):
+    """ Returns the tiles encoded by tiles_to_bytes, as shared tiles with copies assigned in order.
+
+        Args:
+            data(bytes): Tile ids, any bytes-like object.
+
+        Returns:
+            :obj:`list` of :obj:`Tile`: Tiles.
+
+    """
+    return get_tiles_by_id(memoryview(data).cast('B'))
+
 # Ready to go instances for testing
 b_sqr = Tile(Color.BLUE.value, Shape.SQUARE.value)
 b_crc = Tile(Color.BLUE.value, Shape.CIRCLE.value)
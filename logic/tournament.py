@@ -0,0 +1,239 @@
+import argparse
+import functools
+import math
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from logic.bots.bot import Bot
+from logic.bots.monte_carlo_bot import MonteCarloBot
+from logic.bots.search_stats import SearchStats
+from logic.bots.smarter_bot import SmarterBot
+from logic.game import Game
+from logic.game_objects.bag import Bag
+from logic.move_log import GameRecord, MoveLogWriter
+
+# bots that can play a tournament by name, the games already run in parallel so the
+# Monte Carlo bot plays its rollouts in the game process
+bot_classes = {'points': Bot, 'smarter': SmarterBot, 'montecarlo': functools.partial(MonteCarloBot, workers=1)}
+
+# z value of the 95% confidence intervals
+confidence_z = 1.96
+
+
+def play_game(game_number, seed, bot_name_a, bot_name_b, max_turns=1000, collect_stats=False, turn_time=None,
+              record_moves=False):
+    """ Plays a full game between two bots. Bot a starts the even games and bot b the odd ones.
+        Runs in the tournament worker processes, so it only receives and returns plain values.
+
+        Args:
+            game_number(int): Number of the game in the tournament.
+            seed(int): Seed of the game deal.
+            bot_name_a(str): Name of the first bot, a key of bot_classes.
+            bot_name_b(str): Name of the second bot, a key of bot_classes.
+            max_turns(int): Turns after which an unfinished game is stopped.
+            collect_stats(bool): Indicates if the bots collect search stats.
+            turn_time(float): Seconds a bot can search in its turn, None for no limit.
+            record_moves(bool): Indicates if the game record is returned.
+
+        Returns:
+            :obj:`dict`: Game number, seed, starting bot ('a' or 'b'), points of both bots,
+                         turns played, if the game was finished, turns whose search ran out
+                         of time, rollouts played and their seconds by both bots, the search
+                         stats of both bots as dicts, if collected, and the game record as a
+                         dict, if recorded.
+
+    """
+    bot_a = bot_classes[bot_name_a]()
+    bot_b = bot_classes[bot_name_b]()
+    bots = [bot_a, bot_b] if game_number % 2 == 0 else [bot_b, bot_a]
+    if collect_stats:
+        bot_a.stats = SearchStats()
+        bot_b.stats = SearchStats()
+
+    bag = Bag(seed=seed)
+    record = GameRecord(seed, bag, bots) if record_moves else None
+    game = Game(bots, bag=bag, turn_time=turn_time)
+    if record is not None:
+        record.record(game)
+    timed_out_turns = []
+    game.add_turn_hook(lambda game, bot, combo, points: timed_out_turns.append(not game.last_finished))
+    game.play_to_end(max_turns)
+    for bot in bots:
+        bot.close()
+
+    result = {'game': game_number, 'seed': seed, 'starter': 'a' if bots[0] is bot_a else 'b',
+              'points_a': bot_a.points, 'points_b': bot_b.points, 'turns': game.turns, 'finished': game.finished,
+              'timed_out_turns': sum(timed_out_turns)}
+    for bot_key, bot in (('a', bot_a), ('b', bot_b)):
+        result['rollouts_' + bot_key] = getattr(bot, 'rollouts', 0)
+        result['rollouts_time_' + bot_key] = getattr(bot, 'rollouts_time', 0.0)
+    if collect_stats:
+        result['stats_a'] = bot_a.stats.as_dict()
+        result['stats_b'] = bot_b.stats.as_dict()
+    if record is not None:
+        result['record'] = record.to_dict()
+    return result
+
+
+def run_tournament(bot_name_a, bot_name_b, games, seed=0, workers=None, collect_stats=False, turn_time=None,
+                   record_moves=False):
+    """ Plays a number of games between two bots in a pool of processes, alternating the
+        starting bot. Game i is dealt with seed + i, so a tournament can be replayed.
+        Results are yielded as the games finish, not in game order.
+
+        Args:
+            bot_name_a(str): Name of the first bot, a key of bot_classes.
+            bot_name_b(str): Name of the second bot, a key of bot_classes.
+            games(int): Number of games.
+            seed(int): Seed of the first game.
+            workers(int): Number of processes, one per core if None. 1 plays in this process.
+            collect_stats(bool): Indicates if the bots collect search stats.
+            turn_time(float): Seconds a bot can search in its turn, None for no limit.
+            record_moves(bool): Indicates if the game records are returned.
+
+        Yields:
+            :obj:`dict`: Result of a game, see play_game.
+
+    """
+    if workers == 1:
+        for game_number in range(games):
+            yield play_game(game_number, seed + game_number, bot_name_a, bot_name_b,
+                            collect_stats=collect_stats, turn_time=turn_time, record_moves=record_moves)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_game, game_number, seed + game_number, bot_name_a, bot_name_b,
+                                   collect_stats=collect_stats, turn_time=turn_time, record_moves=record_moves)
+                   for game_number in range(games)]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def get_wilson_interval(successes, trials, z=confidence_z):
+    """ Returns the Wilson score interval of a proportion.
+
+        Args:
+            successes(int): Number of successes.
+            trials(int): Number of trials.
+            z(float): Standard normal quantile of the confidence.
+
+        Returns:
+            tuple: Lower and upper bounds, (0, 1) without trials.
+
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    proportion = successes / trials
+    denominator = 1 + z * z / trials
+    center = (proportion + z * z / (2 * trials)) / denominator
+    half_width = z * math.sqrt(proportion * (1 - proportion) / trials + z * z / (4 * trials * trials)) / denominator
+    return center - half_width, center + half_width
+
+
+def get_report(results):
+    """ Summarizes the results of a tournament from the point of view of bot a.
+        The win rate interval is a Wilson interval, the margin one a normal interval.
+
+        Args:
+            results(:obj:`list` of :obj:`dict`): Game results, see play_game.
+
+        Returns:
+            :obj:`dict`: Games, wins, losses and draws of bot a, its win rate with its interval,
+                         its average point margin with its interval and the unfinished games.
+
+    """
+    games = len(results)
+    margins = [result['points_a'] - result['points_b'] for result in results]
+    wins = sum(margin > 0 for margin in margins)
+    losses = sum(margin < 0 for margin in margins)
+
+    average_margin = statistics.mean(margins) if margins else 0.0
+    margin_error = confidence_z * statistics.stdev(margins) / math.sqrt(games) if games > 1 else float('inf')
+
+    return {'games': games, 'wins': wins, 'losses': losses, 'draws': games - wins - losses,
+            'win_rate': wins / games if games else 0.0, 'win_rate_interval': get_wilson_interval(wins, games),
+            'average_margin': average_margin,
+            'margin_interval': (average_margin - margin_error, average_margin + margin_error),
+            'unfinished': sum(not result['finished'] for result in results)}
+
+
+def get_total_stats(results, bot_key):
+    """ Adds the search stats of a bot over the games of a tournament.
+
+        Args:
+            results(:obj:`list` of :obj:`dict`): Game results with stats, see play_game.
+            bot_key(str): 'a' or 'b'.
+
+        Returns:
+            :obj:`SearchStats`: Total search stats of the bot.
+
+    """
+    total_stats = SearchStats()
+    for result in results:
+        total_stats.merge(SearchStats.from_dict(result['stats_' + bot_key]))
+    return total_stats
+
+
+def main(args=None):
+    """ Command line entry point, plays a tournament streaming the results and prints its report.
+        Run as python -m logic.tournament points smarter --games 100.
+
+        Args:
+            args(:obj:`list` of str): Command line arguments, sys.argv if None.
+
+    """
+    parser = argparse.ArgumentParser(description="Plays a tournament between two qwirkle bots.")
+    parser.add_argument('bot_a', choices=sorted(bot_classes), help="first bot")
+    parser.add_argument('bot_b', choices=sorted(bot_classes), help="second bot")
+    parser.add_argument('--games', type=int, default=100, help="number of games")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes, one per core by default")
+    parser.add_argument('--quiet', action='store_true', help="only print the report")
+    parser.add_argument('--stats', action='store_true', help="collect and print the bots search stats")
+    parser.add_argument('--turn-time', type=float, default=None, help="seconds a bot can search in its turn")
+    parser.add_argument('--move-log', help="move log to append the game records, gzip compressed if it ends with .gz")
+    args = parser.parse_args(args)
+
+    results = []
+    move_log = MoveLogWriter(args.move_log) if args.move_log else None
+    start_time = time.perf_counter()
+    for result in run_tournament(args.bot_a, args.bot_b, args.games, args.seed, args.workers, args.stats,
+                                 args.turn_time, move_log is not None):
+        if move_log is not None:
+            move_log.write(result.pop('record'))
+        results.append(result)
+        if not args.quiet:
+            print("game %d (seed %d, %s starts): %s %d - %d %s" % (result['game'], result['seed'],
+                  args.bot_a if result['starter'] == 'a' else args.bot_b,
+                  args.bot_a, result['points_a'], result['points_b'], args.bot_b))
+    elapsed_time = time.perf_counter() - start_time
+    if move_log is not None:
+        move_log.close()
+
+    report = get_report(results)
+    print('')
+    print("%s vs %s, %d games in %.1fs (%.2f games/s)" % (args.bot_a, args.bot_b, report['games'], elapsed_time,
+                                                        report['games'] / elapsed_time if elapsed_time else 0.0))
+    print("%s wins %d, losses %d, draws %d" % (args.bot_a, report['wins'], report['losses'], report['draws']))
+    print("%s win rate %.3f, 95%% CI [%.3f, %.3f]" % ((args.bot_a, report['win_rate']) + report['win_rate_interval']))
+    print("%s average margin %+.2f points, 95%% CI [%+.2f, %+.2f]" % ((args.bot_a, report['average_margin']) +
+                                                                      report['margin_interval']))
+    if report['unfinished']:
+        print("%d games stopped unfinished" % report['unfinished'])
+    timed_out_turns = sum(result['timed_out_turns'] for result in results)
+    if timed_out_turns:
+        print("%d turns ran out of search time" % timed_out_turns)
+    for bot_key, bot_name in (('a', args.bot_a), ('b', args.bot_b)):
+        rollouts = sum(result['rollouts_' + bot_key] for result in results)
+        rollouts_time = sum(result['rollouts_time_' + bot_key] for result in results)
+        if rollouts:
+            print("%s played %d rollouts, %.1f rollouts/s" % (bot_name, rollouts,
+                                                             rollouts / rollouts_time if rollouts_time else 0.0))
+    if args.stats:
+        print("%s search stats: %s" % (args.bot_a, get_total_stats(results, 'a')))
+        print("%s search stats: %s" % (args.bot_b, get_total_stats(results, 'b')))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from logic.game import Game
+from logic.game_objects.bag import Bag
+from logic.game_objects.numpy_board import NumpyBoard
+from logic.tournament import bot_classes
+
+# columns of a shard, each one saved as a .npy file of the shard directory
+shard_columns = {
+    'game_seeds': np.int64,  # seed of the game of each turn
+    'turn_numbers': np.int16,  # number of the turn in its game
+    'board_offsets': np.int64,  # turn board cells are board_cells[board_offsets[i]:board_offsets[i + 1]]
+    'board_cells': np.int16,  # row, column and tile id of the board tiles before the turn
+    'hands': np.int8,  # tile ids of the hand of the bot to play, -1 for missing tiles
+    'candidate_offsets': np.int64,  # turn candidates are candidate_features[candidate_offsets[i]:...]
+    'candidate_features': np.int16,  # qwirkle chances caused, points and lines killed of each candidate
+    'candidate_move_offsets': np.int64,  # candidate moves are candidate_moves[candidate_move_offsets[j]:...]
+    'candidate_moves': np.int16,  # row, column and tile id of the candidate moves, in play order
+    'chosen': np.int32,  # index of the played combo among the turn candidates, -1 for a swap
+    'margins': np.int16,  # final points of the bot to play minus the best of the other bots
+}
+
+
+def get_combo_key(combo):
+    """ Returns the moves of a combo as a tuple of (row, col, tile id), to find it among candidates.
+    """
+    return tuple((position.row, position.col, tile.id) for tile, position in zip(combo.tiles, combo.positions))
+
+
+def get_game_examples(seed, bot_names, max_turns=1000):
+    """ Plays a seeded self-play game and returns its training examples, one for each turn:
+        the board and hand of the bot to play, every combo it could play with its features,
+        the combo it played and its final point margin.
+
+        Args:
+            seed(int): Seed of the game bag.
+            bot_names(:obj:`list` of str): Names of the bots in turn order, keys of bot_classes.
+            max_turns(int): Turns after which an unfinished game is stopped.
+
+        Returns:
+            :obj:`list` of :obj:`dict`: Examples of the turns, their values are NumPy arrays.
+
+    """
+    bots = [bot_classes[bot_name]() for bot_name in bot_names]
+    game = Game(bots, bag=Bag(seed=seed))
+
+    examples = []
+    while not game.finished and game.turns < max_turns:
+        bot = game.get_current_bot()
+        board_cells = np.array([(row, col, tile.id) for (row, col), tile in game.board.tiles.items()],
+                               dtype=np.int16).reshape(-1, 3)
+        hand = np.full(6, -1, dtype=np.int8)
+        hand[:len(bot.hand)] = [tile.id for tile in bot.hand]
+
+        candidates = list(bot.iter_combos(game.board))
+        if candidates:
+            chances, points, kills = NumpyBoard(game.board).get_combos_features(candidates)
+            candidate_features = np.stack([chances, points, kills], axis=1).astype(np.int16)
+        else:
+            candidate_features = np.zeros((0, 3), dtype=np.int16)
+        candidate_keys = [get_combo_key(combo) for combo in candidates]
+
+        combo = game.step(bot)
+        chosen = candidate_keys.index(get_combo_key(combo)) if combo is not None else -1
+        examples.append({'bot': bot, 'turn': game.turns - 1, 'board_cells': board_cells, 'hand': hand,
+                         'candidate_features': candidate_features,
+                         'candidate_moves': [np.array(key, dtype=np.int16).reshape(-1, 3) for key in candidate_keys],
+                         'chosen': chosen})
+
+    for example in examples:
+        bot = example.pop('bot')
+        example['margin'] = bot.points - max(other.points for other in bots if other is not bot)
+    return examples
+
+
+def get_shard_arrays(seeds, bot_names, max_turns=1000):
+    """ Plays the games of a shard and returns their examples as the shard columns.
+
+        Args:
+            seeds(:obj:`list` of int): Seeds of the games.
+            bot_names(:obj:`list` of str): Names of the bots in turn order.
+            max_turns(int): Turns after which an unfinished game is stopped.
+
+        Returns:
+            :obj:`dict`: NumPy arrays by column name, see shard_columns.
+
+    """
+    columns = {name: [] for name in shard_columns}
+    board_offsets = [0]
+    candidate_offsets = [0]
+    candidate_move_offsets = [0]
+    for seed in seeds:
+        for example in get_game_examples(seed, bot_names, max_turns):
+            columns['game_seeds'].append(seed)
+            columns['turn_numbers'].append(example['turn'])
+            columns['board_cells'].append(example['board_cells'])
+            board_offsets.append(board_offsets[-1] + len(example['board_cells']))
+            columns['hands'].append(example['hand'])
+            columns['candidate_features'].append(example['candidate_features'])
+            candidate_offsets.append(candidate_offsets[-1] + len(example['candidate_features']))
+            for moves in example['candidate_moves']:
+                columns['candidate_moves'].append(moves)
+                candidate_move_offsets.append(candidate_move_offsets[-1] + len(moves))
+            columns['chosen'].append(example['chosen'])
+            columns['margins'].append(example['margin'])
+
+    arrays = {
+        'board_offsets': np.array(board_offsets, dtype=np.int64),
+        'candidate_offsets': np.array(candidate_offsets, dtype=np.int64),
+        'candidate_move_offsets': np.array(candidate_move_offsets, dtype=np.int64),
+        'hands': np.array(columns['hands'], dtype=np.int8).reshape(-1, 6),
+    }
+    for name in ('board_cells', 'candidate_features', 'candidate_moves'):
+        arrays[name] = np.concatenate(columns[name]).astype(np.int16) if columns[name] \
+            else np.zeros((0, 3), dtype=np.int16)
+    for name in ('game_seeds', 'turn_numbers', 'chosen', 'margins'):
+        arrays[name] = np.array(columns[name], dtype=shard_columns[name])
+    return arrays
+
+
+def get_shard_path(directory, shard_index):
+    """ Returns the directory of a shard.
+    """
+    return os.path.join(directory, 'shard_%05d' % shard_index)
+
+
+def write_shard(directory, shard_index, seeds, bot_names, max_turns=1000):
+    """ Plays the games of a shard and saves it. The shard is written to a temporary
+        directory renamed when complete, so an interrupted shard is generated again.
+        Runs in the pipeline worker processes, so it only receives and returns plain values.
+
+        Args:
+            directory(str): Dataset directory.
+            shard_index(int): Index of the shard.
+            seeds(:obj:`list` of int): Seeds of the games.
+            bot_names(:obj:`list` of str): Names of the bots in turn order.
+            max_turns(int): Turns after which an unfinished game is stopped.
+
+        Returns:
+            tuple: Shard index and number of examples.
+
+    """
+    arrays = get_shard_arrays(seeds, bot_names, max_turns)
+    shard_path = get_shard_path(directory, shard_index)
+    temporary_path = shard_path + '.tmp'
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    os.makedirs(temporary_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(temporary_path, name + '.npy'), array)
+    os.replace(temporary_path, shard_path)
+    return shard_index, len(arrays['chosen'])
+
+
+def load_shard(shard_path):
+    """ Loads the columns of a shard memory-mapped, they are only read when accessed.
+
+        Args:
+            shard_path(str): Shard directory.
+
+        Returns:
+            :obj:`dict`: Read-only NumPy arrays by column name, see shard_columns.
+
+    """
+    return {name: np.load(os.path.join(shard_path, name + '.npy'), mmap_mode='r') for name in shard_columns}
+
+
+def generate_dataset(directory, games, shard_size=100, seed=0, bot_names=('smarter', 'smarter'), workers=None,
+                     max_turns=1000):
+    """ Generates a dataset of self-play examples in shards of games, played in a pool of
+        processes. Shard i has the games seeded seed + i * shard_size onwards. Shards already
+        in the directory are kept, so an interrupted generation resumes where it stopped.
+        Each process only holds the shard it is playing.
+
+        Args:
+            directory(str): Dataset directory.
+            games(int): Number of games.
+            shard_size(int): Games by shard.
+            seed(int): Seed of the first game.
+            bot_names(:obj:`tuple` of str): Names of the bots in turn order, keys of bot_classes.
+            workers(int): Number of processes, one per core if None. 1 plays in this process.
+            max_turns(int): Turns after which an unfinished game is stopped.
+
+        Yields:
+            tuple: Shard index and number of examples of the shards written, as they are written.
+
+        Raises:
+            ValueError: If the directory has a dataset generated with other settings.
+
+    """
+    settings = {'games': games, 'shard_size': shard_size, 'seed': seed, 'bot_names': list(bot_names),
+                'max_turns': max_turns}
+    os.makedirs(directory, exist_ok=True)
+    settings_path = os.path.join(directory, 'settings.json')
+    if os.path.exists(settings_path):
+        with open(settings_path) as settings_file:
+            if json.load(settings_file) != settings:
+                raise ValueError("Directory has a dataset generated with other settings: " + directory)
+    else:
+        with open(settings_path, 'w') as settings_file:
+            json.dump(settings, settings_file, indent=2)
+
+    shards = []
+    for shard_index, first_game in enumerate(range(0, games, shard_size)):
+        if not os.path.isdir(get_shard_path(directory, shard_index)):
+            seeds = [seed + game for game in range(first_game, min(first_game + shard_size, games))]
+            shards.append((directory, shard_index, seeds, list(bot_names), max_turns))
+
+    if workers == 1:
+        for shard in shards:
+            yield write_shard(*shard)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(write_shard, *shard) for shard in shards]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(args=None):
+    """ Command line entry point, generates a dataset printing the shards as they are written.
+        Run as python -m logic.training_data dataset --games 1000.
+
+        Args:
+            args(:obj:`list` of str): Command line arguments, sys.argv if None.
+
+    """
+    parser = argparse.ArgumentParser(description="Generates training examples from qwirkle self-play games.")
+    parser.add_argument('directory', help="dataset directory, an interrupted generation resumes in it")
+    parser.add_argument('--games', type=int, default=1000, help="number of games")
+    parser.add_argument('--shard-size', type=int, default=100, help="games by shard")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('--bots', nargs=2, default=['smarter', 'smarter'], choices=sorted(bot_classes),
+                        help="bots of the games, in turn order")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes, one per core by default")
+    args = parser.parse_args(args)
+
+    examples = 0
+    start_time = time.perf_counter()
+    for shard_index, shard_examples in generate_dataset(args.directory, args.games, args.shard_size, args.seed,
+                                                        args.bots, args.workers):
+        examples += shard_examples
+        print("shard %d: %d examples" % (shard_index, shard_examples))
+    elapsed_time = time.perf_counter() - start_time
+    print("%d examples in %.1fs" % (examples, elapsed_time))
+
+
+if __name__ == "__main__":
+    main()